@@ -0,0 +1,373 @@
+import argparse
+import time
+from collections import Counter
+
+from compiler import compile_script, OP_MVW, OP_CLT, OP_DRP, OP_NOP, OP_FOR, OP_NEXT, OP_IF, OP_JMP, OP_NAV
+from engine import Mission, script_size, split_blocks, ENERGY_PER_MOVE, COMPLETE, CRASHED, OUT_OF_BOUNDS, POWER, EXECUTIONS
+from grid import DELTAS, DIRECTIONS, FLOOR, WALL, BASE, SAMPLE, UNKNOWN, CHARGER, tile_cell
+
+# Abstract instructions the analysis runs before it gives up on a script
+MAX_WORK: int = 200000
+
+# How a path can end besides the mission outcomes
+FINISHED = "finished"      # the script ran out with executions left
+INCOMPLETE = "incomplete"  # the analysis gave up
+
+FAILURES = (CRASHED, OUT_OF_BOUNDS, POWER, EXECUTIONS)
+
+# ====== PATHS ======
+class Path:
+    """One way a script can play out. Position and terrain are exact, the battery is a range"""
+    __slots__ = ("block", "pc", "loops", "pos", "sample", "cleared", "low", "high", "executions", "memory", "steps", "certain", "marks")
+
+    def copy(self):
+        path = Path()
+        for name in Path.__slots__:
+            setattr(path, name, getattr(self, name))
+        path.marks = dict(self.marks)
+        return path
+
+# ====== ANALYSIS ======
+class Analysis:
+    """Abstract interpretation of scripts over a mission's known grid.
+
+    The script runs on Paths instead of a rover. Moves, tiles and loop counts are known ahead
+    of time. The only unknown is what [?] tiles do to the battery, so a path carries the battery
+    as a range, widened by +15/-20 at each [?]. An `if` splits a path in two when the range
+    doesn't decide it. A loop iteration that ends in the same state as the one before it will
+    repeat unchanged, so the remaining iterations are skipped instead of run; loops that do
+    change something drain the battery and end within a few dozen iterations.
+    """
+    def __init__(self, mission, blocks):
+        self.grid = mission.grid
+        self.level = mission.level
+        self.memory = mission.memory
+        self.programs = [compile_script(block) for block in blocks]
+        self.sizes = [script_size(block) for block in blocks]
+        self.offsets = [sum(len(block) for block in blocks[:i]) for i in range(len(blocks))]
+        self.findings = {}
+        self.outcomes = Counter()
+        self.reached = [set() for _ in blocks]  # Instruction indexes some path ran
+        self.branches = [{} for _ in blocks]  # If instruction -> the sides some path took
+        self.seen = {}  # State without the battery -> widest battery range it was reached with
+        self.terrains = {}  # Cleared tiles -> copy of the grid with them cleared, for distances and nav
+        self.work = 0
+
+        path = Path()
+        path.block, path.pc, path.loops = 0, 0, ()
+        path.pos, path.sample, path.cleared = mission.rover_pos, mission.sample_onboard, frozenset()
+        path.low = path.high = mission.battery
+        path.executions, path.memory = mission.executions, mission.remaining_memory
+        path.steps, path.certain, path.marks = 0, True, {}
+        self.paths = [path] if blocks else []
+        if blocks:
+            self.submit(path)
+
+    def line(self, path):
+        """Script line of the instruction the path just ran"""
+        return self.offsets[path.block] + self.programs[path.block].lines[path.pc - 1]
+
+    def find(self, kind, path, line, **data):
+        finding = self.findings.setdefault((kind, line), dict(kind=kind, line=line, certain=False, paths=0, **data))
+        finding["certain"] |= path.certain
+        finding["paths"] += 1
+
+    def end(self, path, outcome):
+        self.outcomes[outcome] += 1
+        path.block = None
+
+    def tile(self, path, pos):
+        return FLOOR if pos in path.cleared else self.grid.get(pos)
+
+    # ====== BLOCKS ======
+    def submit(self, path):
+        """Charge the next block against memory and executions, like Mission.submit"""
+        size = self.sizes[path.block]
+        path.executions -= 1
+        if size > path.memory:
+            self.find("overflow", path, self.offsets[path.block] + 1, size=size, available=path.memory)
+            self.finish_block(path)
+            return
+        path.memory -= size
+        path.pc, path.loops, path.marks = 0, (), {}
+
+    def finish_block(self, path):
+        if path.executions <= 0:
+            self.end(path, EXECUTIONS)
+        elif path.block + 1 < len(self.programs):
+            path.block += 1
+            self.submit(path)
+        else:
+            self.end(path, FINISHED)
+
+    # ====== INTERPRETER ======
+    def run(self):
+        while self.paths:
+            path = self.paths.pop()
+            while path.block is not None:
+                if self.work >= MAX_WORK:
+                    self.end(path, INCOMPLETE)
+                    break
+                self.work += 1
+                self.step(path)
+        return self.report()
+
+    def step(self, path):
+        program = self.programs[path.block]
+        if path.pc >= len(program):
+            self.finish_block(path)
+            return
+        at = path.pc * 3
+        op, a, b = program.code[at], program.code[at + 1], program.code[at + 2]
+        self.reached[path.block].add(path.pc)
+        path.pc += 1
+
+        if op < OP_FOR:
+            self.execute(path, op)
+        elif op == OP_FOR:
+            if a > 0:
+                path.loops += (a,)
+            else:
+                path.pc = b
+        elif op == OP_NEXT:
+            self.next(path, a)
+        elif op == OP_IF:
+            self.branch(path, program.conditions[a], b)
+        elif op == OP_JMP:
+            path.pc = a
+        elif op == OP_NAV:
+            grid = self.terrain(path)
+            move = grid.route(path.pos, a)
+            if move is None:
+                if grid.distance(path.pos, a) is None:
+                    self.find("no_route", path, self.line(path), target=tile_cell(a))
+                self.execute(path, OP_NOP)
+            else:
+                arrives = not grid.distance(grid.neighbor(path.pos, DELTAS[move]), a)
+                self.execute(path, move)
+                if not arrives and path.block is not None:
+                    path.pc -= 1  # Mission.step stays on a nav until the move that gets the rover there
+
+    def next(self, path, start):
+        depth, count = len(path.loops), path.loops[-1]
+        state = (path.pc, path.loops[:-1], path.pos, path.sample, path.cleared, path.low, path.high)
+        mark = path.marks.get(depth)
+        if count > 1 and mark is not None and mark[0] == state:
+            # The last iteration changed nothing but the step count, so neither will the rest
+            path.steps += (count - 1) * (path.steps - mark[1])
+            count = 1
+        if count > 1:
+            path.marks[depth] = (state, path.steps)
+            path.loops = path.loops[:-1] + (count - 1,)
+            path.pc = start
+        else:
+            path.marks.pop(depth, None)
+            path.loops = path.loops[:-1]
+
+    def branch(self, path, condition, else_pc):
+        at = path.pc - 1
+        sides = self.branches[path.block].setdefault(at, set())
+        then_range, else_range = self.decide(path, condition)
+        if then_range and else_range:
+            other = path.copy()
+            other.certain = path.certain = False
+            other.low, other.high = else_range
+            other.pc = else_pc
+            path.low, path.high = then_range
+            sides.update((True, False))
+            if not self.subsumed(other):
+                self.paths.append(other)
+            if self.subsumed(path):
+                path.block = None
+        elif then_range:
+            sides.add(True)
+            path.low, path.high = then_range
+        else:
+            sides.add(False)
+            path.low, path.high = else_range
+            path.pc = else_pc
+
+    def subsumed(self, path):
+        """True if an earlier path got to the same place with at least this battery range"""
+        key = (path.block, path.pc, path.loops, path.pos, path.sample, path.cleared, path.executions, path.memory)
+        seen = self.seen.get(key)
+        if seen is not None and seen[0] <= path.low and path.high <= seen[1]:
+            return True
+        if seen is not None:
+            # Carry on with the widened range, so it covers everything pruned against it later
+            path.low, path.high = min(seen[0], path.low), max(seen[1], path.high)
+        self.seen[key] = (path.low, path.high)
+        return False
+
+    def decide(self, path, condition):
+        """Battery ranges for which the condition holds and for which it doesn't, None when empty"""
+        left, compare, right = condition
+        if left[0] == "BATTERY" and right[0] == "BATTERY":
+            candidates = [path.low]
+        else:
+            candidates = {path.low, path.high}
+            # Where the other side can flip the outcome, whether it's a constant or a value like DIST_CHARGE
+            for side in (left, right):
+                value = self.value(path, side, None) if side[0] != "BATTERY" else None
+                if isinstance(value, int):
+                    candidates.update(v for v in (value - 1, value, value + 1) if path.low <= v <= path.high)
+        held, failed = [], []
+        for battery in candidates:
+            try:
+                result = compare(self.value(path, left, battery), self.value(path, right, battery))
+            except TypeError:
+                result = False
+            (held if result else failed).append(battery)
+        # The sides of a comparison are ranges of the battery, so their extremes are enough
+        return (min(held), max(held)) if held else None, (min(failed), max(failed)) if failed else None
+
+    def value(self, path, operand, battery):
+        kind, value = operand
+        match kind:
+            case "CONST":
+                return value
+            case "BATTERY":
+                return battery
+            case "MEMORY":
+                return self.memory
+            case "EXECUTIONS":
+                return path.executions
+            case "LEVEL":
+                return self.level
+            case "CURRENT_BLOCK":
+                return chr(self.tile(path, path.pos))
+            case "LOOK":
+                pos = self.grid.neighbor(path.pos, DIRECTIONS[value])
+                return chr(self.tile(path, pos)) if pos is not None else None
+            case "DIST":
+                return self.terrain(path).distance(path.pos, value)
+
+    def terrain(self, path):
+        """The grid as the path sees it, with the tiles it cleared so far"""
+        if not path.cleared:
+            return self.grid
+        grid = self.terrains.get(path.cleared)
+        if grid is None:
+            grid = self.terrains[path.cleared] = self.grid.copy()
+            for pos in path.cleared:
+                grid.set(pos, FLOOR)
+        return grid
+
+    def execute(self, path, op):
+        """One instruction, as Mission.execute runs it"""
+        path.steps += 1
+        if op != OP_NOP:
+            path.low -= ENERGY_PER_MOVE
+            path.high -= ENERGY_PER_MOVE
+            if op <= OP_MVW:
+                pos = self.grid.neighbor(path.pos, DELTAS[op])
+                if pos is None:
+                    self.find("out_of_bounds", path, self.line(path))
+                    self.end(path, OUT_OF_BOUNDS)
+                    return
+                path.pos = pos
+            elif op == OP_CLT and self.tile(path, path.pos) == SAMPLE:
+                path.cleared |= {path.pos}
+                path.sample = True
+            elif op == OP_DRP and self.tile(path, path.pos) == BASE and path.sample:
+                self.end(path, COMPLETE)
+                return
+
+        tile = self.tile(path, path.pos)
+        if tile == UNKNOWN:
+            path.cleared |= {path.pos}
+            path.low = max(0, path.low - 20)
+            path.high = min(path.high + 15, 100)
+        elif tile == CHARGER:
+            path.low += min(25, 100 - path.low)
+            path.high += min(25, 100 - path.high)
+        elif tile == WALL:
+            self.find("crash", path, self.line(path))
+            self.end(path, CRASHED)
+            return
+
+        if path.high <= 0:
+            self.find("power", path, self.line(path))
+            self.end(path, POWER)
+        elif path.low <= 0:
+            self.find("possible_power", path, self.line(path))
+            self.outcomes[POWER] += 1
+            path.low = 1  # Carry on with the batteries that survived
+
+    # ====== REPORT ======
+    def report(self):
+        findings = list(self.findings.values())
+        for block, program in enumerate(self.programs):
+            lines = {}
+            for at, line in enumerate(program.lines):
+                lines.setdefault(line, []).append(at)
+            reached = self.reached[block]
+            # Lines after the last one reached are the fallout of the findings that ended every path there
+            last = max((program.lines[at] for at in reached), default=0)
+            for line, ats in lines.items():
+                if line < last and not any(at in reached for at in ats):
+                    findings.append({"kind": "unreachable", "line": self.offsets[block] + line, "certain": True, "paths": 0})
+            for at, sides in self.branches[block].items():
+                for side, name in ((True, "then"), (False, "else")):
+                    if side not in sides:
+                        findings.append({"kind": "dead_branch", "line": self.offsets[block] + program.lines[at], "branch": name, "certain": True, "paths": 0})
+        findings.sort(key=lambda finding: (finding["line"], finding["kind"]))
+
+        endings = set(self.outcomes)
+        return {
+            "outcomes": dict(self.outcomes),
+            "findings": findings,
+            "doomed": bool(endings) and endings <= set(FAILURES) or any(f["kind"] == "overflow" for f in findings),
+            "work": self.work
+        }
+
+def analyze(mission, blocks):
+    """Check execution blocks against a mission's current state without running them.
+
+    Returns {"outcomes", "findings", "doomed", "work"}. Outcomes count the ways the paths end.
+    Each finding has a kind (crash, out_of_bounds, power, possible_power, overflow, unreachable,
+    dead_branch) and a line in the script. `certain` means a path with no undecided `if` on the
+    way gets there. Doomed scripts can only fail or waste their execution.
+    """
+    return Analysis(mission, blocks).run()
+
+# ====== COMMAND LINE ======
+DESCRIPTIONS = {
+    "crash": "drives into a wall",
+    "out_of_bounds": "drives off the map",
+    "power": "runs out of battery",
+    "possible_power": "may run out of battery, depending on [?] tiles",
+    "overflow": "doesn't fit in memory",
+    "unreachable": "never runs",
+    "dead_branch": "{branch} branch never runs",
+    "no_route": "nav has no known way to {target} and does nothing"
+}
+
+def describe(finding):
+    text = DESCRIPTIONS[finding["kind"]].format(**finding)
+    if finding["kind"] in ("crash", "out_of_bounds", "power") and not finding["certain"]:
+        text = "can " + text.replace("drives", "drive").replace("runs", "run")
+    return f"Line {finding['line']}: {text}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the ways a script fails on a level without running it")
+    parser.add_argument("script", help="script file; blocks ending in 'end' are separate executions")
+    parser.add_argument("--level", type=int, default=1)
+    args = parser.parse_args()
+
+    from generator import sector
+    with open(args.script) as f:
+        blocks = split_blocks(f.read().splitlines())
+    mission = Mission(sector(args.level))
+    start = time.perf_counter()
+    report = analyze(mission, blocks)
+    elapsed = time.perf_counter() - start
+
+    for finding in report["findings"]:
+        print(describe(finding))
+    endings = ", ".join(f"{outcome} {count}" for outcome, count in report["outcomes"].items())
+    print(f"Paths: {endings}")
+    print(f"{'Doomed' if report['doomed'] else 'Can succeed'}, analyzed in {elapsed * 1000:.1f} ms ({report['work']} abstract steps)")
+
+if __name__ == '__main__':
+    main()
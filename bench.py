@@ -0,0 +1,270 @@
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import compiler
+from compiler import compile_script, OP_OBS
+from engine import Mission, load_level
+from grid import Grid, ROVER, SAMPLE
+from renderer import Renderer
+
+# Where --save writes and comparisons read from. Timings only mean something on the machine
+# that made them, so the baseline isn't checked in.
+BASELINE_FILE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+# How much slower than the baseline a benchmark may get before it counts as a regression
+TOLERANCE: float = 0.25
+# Every sample runs for at least this long
+MIN_SAMPLE: float = 0.2
+REPEATS: int = 5
+
+# Plenty of battery and memory, so benchmarks measure the rules and not the mission ending
+BUDGET = {"battery": 10 ** 9, "memory": 10 ** 9, "executions": 10 ** 9}
+
+# ====== FIXTURES ======
+def open_level(height, width):
+    """Level dict with an open grid, R in the top left corner and S in the bottom right"""
+    grid = Grid(height, width)
+    grid.tiles[0] = ROVER
+    grid.tiles[-1] = SAMPLE
+    return dict(BUDGET, level=None, name="bench", map=grid)
+
+def run_script(level, script):
+    """Callable that runs script on a fresh mission and returns how many instructions ran"""
+    def run():
+        mission = Mission(level)
+        mission.execute_script(script)
+        return mission.steps
+    return run
+
+# ====== BENCHMARKS ======
+# Each benchmark returns a callable; calling it does some work and returns how many operations it did
+def bench_moves():
+    return run_script(open_level(2, 2), ["mve", "mvw"] * 500 + ["end"])
+
+def bench_for():
+    return run_script(open_level(2, 2), ["for 500>>mve,mvw", "end"])
+
+def bench_if():
+    # At column 0 the tile east is floor, at column 1 it's off the map, so the rover paces
+    return run_script(open_level(2, 2), ["for 1000>>if mve == X then mve else mvw", "end"])
+
+def bench_compile():
+    script = ["mvn", "for 10>>mve,mvs", "if BATTERY > 50 then mvn else obs", "clt", "drp"] * 20 + ["end"]
+    def run():
+        compiler._cache.clear()
+        compile_script(script)
+        return len(script)
+    return run
+
+def bench_handle_if():
+    mission = Mission(open_level(3, 3))
+    program = compile_script([
+        "if BATTERY > 50 then obs else obs",
+        "if CURRENT_BLOCK == X then obs else obs",
+        "if mve == # then obs else obs",
+        "if MEMORY <= 'text' then obs else obs"
+    ])
+    conditions = program.conditions * 250
+    def run():
+        for condition in conditions:
+            mission.handle_if(condition)
+        return len(conditions)
+    return run
+
+def bench_step():
+    # One turn in place: pay for it, resolve the tile under the rover, report it
+    mission = Mission(open_level(3, 3))
+    def run():
+        for _ in range(1000):
+            mission.execute(OP_OBS)
+        return 1000
+    return run
+
+def bench_frame(size, full, screen=None):
+    mission = Mission(open_level(size, size))
+    renderer = Renderer(out=io.StringIO(), size=screen)
+    status = ["Battery: 100%", "Available memory: 800 bytes", "Used memory: 0 bytes", "Code executions left: 1", "Sample not collected"]
+    def run():
+        renderer.out = io.StringIO()
+        for i in range(10):
+            if full:
+                renderer.invalidate()
+            mission.rover_pos = (0, i % 2)
+            renderer.draw(mission, status)
+        return 10
+    return run
+
+def bench_print_map():
+    import play
+    session = play.Session(None)
+    session.mission = Mission(load_level(1))
+    def run():
+        session.renderer.out = io.StringIO()
+        for i in range(10):
+            session.print_map()
+        return 10
+    return run
+
+def bench_load_level():
+    def run():
+        for _ in range(100):
+            load_level(1)
+        return 100
+    return run
+
+def bench_get_map():
+    import play
+    session = play.Session(None)
+    def run():
+        session.renderer.out = io.StringIO()
+        session.renderer.invalidate()
+        session.get_map()
+        return 1
+    return run
+
+def bench_startup():
+    # From starting `play.py --no-intro` to its first script prompt, the wait before you can play.
+    # It runs in an empty directory so nothing is added to this checkout's logs.
+    play = os.path.join(os.path.dirname(os.path.abspath(__file__)), "play.py")
+    def run():
+        with tempfile.TemporaryDirectory() as cwd:
+            game = subprocess.Popen([sys.executable, play, "--no-intro", "--operator", "bench"], cwd=cwd,
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            output = b""
+            while b"1: " not in output and (chunk := game.stdout.read1(4096)):
+                output += chunk
+            game.kill()
+            game.wait()
+        return 1
+    return run
+
+BENCHMARKS = {
+    "interpreter_moves": bench_moves,
+    "interpreter_for": bench_for,
+    "interpreter_if": bench_if,
+    "compile": bench_compile,
+    "handle_if": bench_handle_if,
+    "step": bench_step,
+    "frame_full_16": lambda: bench_frame(16, True),
+    "frame_diff_16": lambda: bench_frame(16, False),
+    "frame_full_100": lambda: bench_frame(100, True),
+    "frame_diff_100": lambda: bench_frame(100, False),
+    "frame_full_500": lambda: bench_frame(500, True),
+    "frame_diff_500": lambda: bench_frame(500, False),
+    # A 120x40 screen, so these go through the viewport and minimap
+    "frame_view_full_2000": lambda: bench_frame(2000, True, (120, 40)),
+    "frame_view_diff_2000": lambda: bench_frame(2000, False, (120, 40)),
+    "print_map": bench_print_map,
+    "load_level": bench_load_level,
+    "get_map": bench_get_map,
+    "startup": bench_startup
+}
+
+# ====== RUNNER ======
+def measure(run, min_sample=MIN_SAMPLE, repeats=REPEATS):
+    """Best seconds per operation over `repeats` samples of at least `min_sample` seconds"""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        ops = sum(run() for _ in range(calls))
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample:
+            break
+        calls *= 2 if elapsed <= 0 else max(2, int(min_sample / elapsed * 1.2))
+    best = elapsed / ops
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        ops = sum(run() for _ in range(calls))
+        best = min(best, (time.perf_counter() - start) / ops)
+    return best
+
+def headless():
+    """No sleeps, no shell, and a terminal tall enough that frames are diffed, not redrawn"""
+    import play
+
+    async def pause(session, seconds):
+        pass
+
+    play.Session.pause = pause
+    os.environ["LINES"] = "100000"
+    os.environ["COLUMNS"] = "100000"
+
+def run_benchmarks(names, min_sample=MIN_SAMPLE, repeats=REPEATS):
+    headless()
+    results = {}
+    for name in names:
+        seconds = measure(BENCHMARKS[name](), min_sample, repeats)
+        results[name] = {"seconds_per_op": seconds, "ops_per_sec": 1 / seconds}
+        print(f"  {name:<20} {1 / seconds:>14,.0f} ops/s  {seconds * 1e6:>12.3f} us/op", file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "benchmarks": results
+    }
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Benchmarks that got slower than the baseline by more than tolerance, as (name, ratio)"""
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            continue
+        ratio = result["seconds_per_op"] / before["seconds_per_op"]
+        if ratio > 1 + tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the interpreter, renderer and level loading")
+    parser.add_argument("--only", help="regex of benchmark names to run")
+    parser.add_argument("--json", help="write results to this file ('-' for stdout)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline to compare against or save to")
+    parser.add_argument("--save", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown, 0.25 is 25%%")
+    parser.add_argument("--quick", action="store_true", help="shorter samples, noisier numbers")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.only or re.search(args.only, name)]
+    if args.quick:
+        results = run_benchmarks(names, min_sample=0.05, repeats=3)
+    else:
+        results = run_benchmarks(names)
+
+    if args.json == "-":
+        print(json.dumps(results, indent=2))
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save to create one", file=sys.stderr)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for name, result in results["benchmarks"].items():
+        if name in baseline["benchmarks"]:
+            change = result["seconds_per_op"] / baseline["benchmarks"][name]["seconds_per_op"] - 1
+            print(f"  {name:<20} {change:>+8.1%} vs baseline", file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.2f}x slower than baseline", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import operator
+import re
+from array import array
+
+from grid import BASE, SAMPLE, CHARGER
+
+# ====== GAME COMMANDS ======
+commands = [
+    "mvn",
+    "mve",
+    "mvs",
+    "mvw",
+    "obs",
+    "clt",
+    "drp",
+    "end"
+]
+
+IF_PATTERN = re.compile(r"^\s*(if)\s+(\S+)\s*(==|!=|>|<|>=|<=)\s*(\S+|\'[^']+\'|\"[^\"]+\")\s+(then)\s+(nav\s+\S+|\S+)\s+(else)\s+(nav\s+\S+|\S+)")
+FOR_PATTERN = re.compile(r"^\s*(for)\s+(\d+)\s*(>>)\s*(.+)")
+NAV_PATTERN = re.compile(r"^\s*nav\s+(?:\[([SB@])\]|([SB@]))\s*$", re.IGNORECASE)
+
+# What `nav` can head for
+NAV_TARGETS = {"S": SAMPLE, "B": BASE, "@": CHARGER}
+
+# ====== OPCODES ======
+# Instructions, in the same order as `commands`. Anything below OP_FOR is one rover step.
+OP_MVN, OP_MVE, OP_MVS, OP_MVW, OP_OBS, OP_CLT, OP_DRP, OP_END, OP_NOP = range(9)
+# Control flow
+OP_FOR = 9    # a: count, b: target after the loop
+OP_NEXT = 10  # a: first op of the loop body
+OP_IF = 11    # a: condition index, b: else target
+OP_JMP = 12   # a: target
+# A rover step picked from the map at run time
+OP_NAV = 13   # a: tile code to head for, one move per step until the rover is there
+
+OPCODES = {cmd: i for i, cmd in enumerate(commands)}
+
+COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">":  operator.gt,
+    "<":  operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le
+}
+
+VARIABLES = {"BATTERY", "MEMORY", "EXECUTIONS", "LEVEL", "CURRENT_BLOCK"}
+LOOKAHEADS = {"mvn", "mve", "mvs", "mvw"}
+# Moves to the nearest tile of a kind, over explored terrain
+DISTANCES = {"DIST_BASE": BASE, "DIST_SAMPLE": SAMPLE, "DIST_CHARGE": CHARGER}
+
+CACHE_SIZE: int = 1024
+
+# ====== PROGRAM ======
+class Program:
+    """A compiled script: three ints (op, a, b) per instruction plus the tables they point into"""
+    def __init__(self):
+        self.code = array('l')
+        self.lines = array('l')
+        self.conditions = []
+        self.warnings = []
+
+    def __len__(self):
+        return len(self.lines)
+
+    def op(self, op, a=0, b=0, line=0):
+        self.code.extend((op, a, b))
+        self.lines.append(line)
+        return len(self.lines) - 1
+
+    def patch(self, at, a=None, b=None):
+        if a is not None:
+            self.code[at * 3 + 1] = a
+        if b is not None:
+            self.code[at * 3 + 2] = b
+
+_cache = {}
+
+def compile_script(script):
+    """Compile a list of script lines into a Program. Programs are cached by content hash"""
+    digest = hashlib.sha1()
+    for ins in script:
+        # Length-prefixed, so [] and [""] or ["a\nb"] and ["a", "b"] don't share a key
+        digest.update(f"{len(ins)}:{ins}".encode())
+    key = digest.hexdigest()
+    program = _cache.get(key)
+    if program is None:
+        program = Program()
+        for line, ins in enumerate(script, 1):
+            compile_instruction(program, ins, line)
+        if len(_cache) >= CACHE_SIZE:
+            _cache.clear()
+        _cache[key] = program
+    return program
+
+def compile_instruction(program, ins, line):
+    if_match = IF_PATTERN.match(ins)
+    for_match = FOR_PATTERN.match(ins)
+    nav_match = NAV_PATTERN.match(ins)
+
+    if if_match:
+        _, left, op, right, _, then_cmd, _, else_cmd = if_match.groups()
+        right = right.strip("'\"")  # Strip quotes
+        program.conditions.append((operand(left), COMPARISONS[op], operand(right)))
+
+        at_if = program.op(OP_IF, len(program.conditions) - 1, 0, line)
+        compile_instruction(program, then_cmd, line)
+        at_jmp = program.op(OP_JMP, 0, 0, line)
+        program.patch(at_if, b=len(program))
+        compile_instruction(program, else_cmd, line)
+        program.patch(at_jmp, a=len(program))
+
+    elif for_match:
+        count = int(for_match.group(2))
+        at_for = program.op(OP_FOR, count, 0, line)
+        for cmd in for_match.group(4).split(','):
+            compile_instruction(program, cmd.strip(), line)
+        program.op(OP_NEXT, at_for + 1, 0, line)
+        program.patch(at_for, b=len(program))
+
+    elif nav_match:
+        target = nav_match.group(1) or nav_match.group(2)
+        program.op(OP_NAV, NAV_TARGETS[target.upper()], 0, line)
+
+    elif ins in OPCODES:
+        program.op(OPCODES[ins], 0, 0, line)
+
+    else:
+        # Unknown instructions still take a turn, they just don't do anything
+        if ins.strip():
+            program.warnings.append((line, ins))
+        program.op(OP_NOP, 0, 0, line)
+
+def operand(token):
+    """Resolve an if-statement token into a (kind, value) pair once, at compile time"""
+    if token.upper() in VARIABLES:
+        return (token.upper(), None)
+    elif token.upper() in DISTANCES:
+        return ("DIST", DISTANCES[token.upper()])
+    elif token in LOOKAHEADS:
+        return ("LOOK", token)
+    try:
+        return ("CONST", int(token))
+    except ValueError:
+        return ("CONST", token.strip("\"'"))
@@ -0,0 +1,185 @@
+import argparse
+from collections import deque
+
+from compiler import commands, compile_script, OP_NOP, OP_FOR, OP_NEXT, OP_IF, OP_JMP, OP_NAV
+from engine import load_level, script_size, COST_PER_BYTE
+
+# Longest repeating pattern tried for a for loop
+MAX_PERIOD: int = 64
+# Longest instruction sequence we're willing to compress
+MAX_MOVES: int = 20000
+# Loop counts that take 1, 2, 3... digits to write
+COUNTS = [(max(2, 10 ** (digits - 1)), 10 ** digits - 1) for digits in range(1, len(str(MAX_MOVES)) + 1)]
+
+# Instruction text per opcode. A no-op turn is cheapest as an empty line.
+NAMES = commands + [""]
+
+def expand(script):
+    """Flatten a script into the instructions it executes, one per turn"""
+    program = compile_script(script)
+    code = program.code
+    moves, pc, loops = [], 0, []
+    while pc < len(program):
+        op, a, b = code[pc * 3], code[pc * 3 + 1], code[pc * 3 + 2]
+        pc += 1
+        if op <= OP_NOP:
+            moves.append(NAMES[op])
+            if len(moves) > MAX_MOVES:
+                raise ValueError(f"script runs more than {MAX_MOVES} instructions")
+        elif op == OP_FOR:
+            if a > 0:
+                loops.append(a)
+            else:
+                pc = b
+        elif op == OP_NEXT:
+            loops[-1] -= 1
+            if loops[-1] > 0:
+                pc = a
+            else:
+                loops.pop()
+        elif op == OP_IF:
+            raise ValueError(f"line {program.lines[pc - 1]}: if statements depend on the map and can't be flattened")
+        elif op == OP_JMP:
+            pc = a
+        elif op == OP_NAV:
+            raise ValueError(f"line {program.lines[pc - 1]}: nav depends on the map and can't be flattened")
+    return moves
+
+def loop_line(count, pattern):
+    # Spaces around '>>' and after commas are optional to the parser, and every character costs
+    return f"for {count}>>" + ",".join(pattern)
+
+def compress(moves):
+    """Shortest list of script lines that runs exactly `moves`.
+
+    Dynamic programming over where each line ends: a line is either one instruction or a
+    `for` loop over a pattern repeated back to back. cost[i] is the fewest characters that
+    cover moves[:i].
+
+    A loop's text only depends on its pattern and on how many digits its count has, so the loops
+    that could end at i are grouped by period and count width. Each group keeps its possible starts
+    in a window, cheapest first, and the best loop ending at i is the front of the window instead
+    of a scan over every count. That keeps long runs linear rather than quadratic.
+    """
+    n = len(moves)
+    if n > MAX_MOVES:
+        raise ValueError(f"more than {MAX_MOVES} instructions")
+    cost = [0] + [None] * n
+    line = [None] * (n + 1)
+
+    # same[p][j]: how many instructions from j on match the ones p places further along
+    same = {}
+    for period in range(1, min(MAX_PERIOD, n // 2) + 1):
+        run = [0] * (n + 1)
+        for j in range(n - period - 1, -1, -1):
+            if moves[j] == moves[j + period]:
+                run[j] = run[j + 1] + 1
+        same[period] = run
+
+    divisors = {p: [d for d in range(1, p) if p % d == 0] for p in same}
+    # Loop starts by (period, count width, start % period), cheapest first. Entries expire once
+    # their count would take another digit or the pattern stopped repeating since they were added.
+    windows = {}
+
+    for i in range(1, n + 1):
+        cost[i], line[i] = cost[i - 1] + len(moves[i - 1]), (i - 1, moves[i - 1])
+
+        for period in range(1, min(MAX_PERIOD, i // 2) + 1):
+            run = same[period]
+            if run[i - 2 * period] < period:
+                continue  # moves[:i] doesn't end in a pattern of this length repeated
+            # A pattern that is itself a shorter pattern repeated never beats looping the shorter one
+            if any(same[d][i - period] >= period - d for d in divisors[period]):
+                continue
+            pattern = moves[i - period:i]
+            body = len(",".join(pattern))
+            if body == 0:
+                continue  # A loop needs a body, and empty lines are free anyway
+
+            for width, (low, high) in enumerate(COUNTS):
+                j = i - low * period
+                if j < 0:
+                    break
+                window = windows.setdefault((period, width, i % period), deque())
+                if run[j] < i - j - period:
+                    window.clear()  # The repeats don't reach back this far, nor for wider counts
+                    break
+                while window and cost[window[-1]] >= cost[j]:
+                    window.pop()
+                window.append(j)
+                while window[0] < i - high * period or run[window[0]] < i - window[0] - period:
+                    window.popleft()
+
+                j = window[0]
+                candidate = cost[j] + len(f"for {low}>>") + body
+                if candidate < cost[i]:
+                    cost[i], line[i] = candidate, (j, loop_line((i - j) // period, pattern))
+
+    lines = []
+    i = n
+    while i > 0:
+        j, text = line[i]
+        lines.append(text)
+        i = j
+    lines.reverse()
+    return lines
+
+def split(lines, memory, executions):
+    """The two ways worth submitting the lines, each block ending in 'end': all in one block, and
+    the last line split off into a second block. Returns the ones that fit in memory and executions.
+
+    Memory is shared by every execution, so one block is always the smallest. Any split into two
+    costs the same extra 'end', and the delivery bonus only counts the final block, so splitting
+    off just the last line beats every other split point. More blocks only add more 'end's.
+    """
+    plans = [[lines + ["end"]]]
+    if executions >= 2 and len(lines) >= 2:
+        plans.append([lines[:-1] + ["end"], lines[-1:] + ["end"]])
+    return [plan for plan in plans if sum(script_size(block) for block in plan) <= memory]
+
+def bonus(memory, plan):
+    """Delivery bonus if the last block finishes the mission, the same formula the game uses"""
+    return (memory - script_size(plan[-1])) * COST_PER_BYTE
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Shrink a move sequence or script to the fewest bytes")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--moves", help="instructions separated by spaces or commas, e.g. 'mvn mvn mve clt'")
+    source.add_argument("--script", help="script file; 'end' lines are treated as block separators")
+    source.add_argument("--solve", action="store_true", help="compress the solver's route for the level")
+    parser.add_argument("--level", type=int, default=1, help="level whose memory and executions to fit")
+    args = parser.parse_args()
+
+    level = load_level(args.level)
+    if args.moves:
+        moves = args.moves.replace(",", " ").split()
+    elif args.script:
+        with open(args.script) as f:
+            moves = expand([ins for ins in f.read().splitlines() if ins != "end"])
+    else:
+        from solver import solve
+        route = solve(args.level)
+        if route is None:
+            print(f"Level {args.level}: no legal route to compress")
+            return
+        moves = route["moves"]
+
+    lines = compress(moves)
+    assert expand(lines) == moves
+
+    print(f"{len(moves)} instructions -> {len(lines)} lines")
+    for text in lines:
+        print(f"  {script_size([text]):>5} bytes  {text}")
+
+    plans = split(lines, level["memory"], level["executions"])
+    if not plans:
+        print(f"Too large for level {args.level}: {script_size(lines + ['end'])} bytes, {level['memory']} available")
+        return
+    for plan in plans:
+        sizes = " + ".join(str(script_size(block)) for block in plan)
+        name = "One block" if len(plan) == 1 else "Last line split off"
+        print(f"{name}: {sizes} bytes, bonus €{bonus(level['memory'], plan):,.2f}")
+
+if __name__ == '__main__':
+    main()
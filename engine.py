@@ -0,0 +1,371 @@
+import random
+from compiler import compile_script, OP_MVW, OP_OBS, OP_NOP, OP_FOR, OP_NEXT, OP_IF, OP_JMP, OP_NAV
+from grid import Grid, DELTAS, DIRECTIONS, FLOOR, WALL, BASE, SAMPLE, ROVER, UNKNOWN, CHARGER, tile_cell
+
+# ====== ENGINE CONSTANTS ======
+CHAR_SIZE: int = 8
+# Extra bytes for every `nav` in a script, on top of its characters. One nav does the work of a
+# whole route of moves, so it can't cost as little as the five characters it's written in.
+NAV_SIZE: int = 64
+COST_PER_BYTE: float = 1.25
+ENERGY_PER_MOVE: int = 2
+
+# Defaults for custom grids that don't come with a level budget
+DEFAULT_BATTERY: int = 100
+DEFAULT_MEMORY: int = 800
+DEFAULT_EXECUTIONS: int = 1
+
+# Mission outcomes. None means the mission is still running.
+COMPLETE = "complete"
+CRASHED = "crashed"
+OUT_OF_BOUNDS = "out_of_bounds"
+POWER = "power"
+EXECUTIONS = "executions"
+
+# ====== UTILITY FUNCTIONS ======
+def script_size(script):
+    """Bytes a script occupies in rover memory"""
+    navs = compile_script(script).code[::3].count(OP_NAV)
+    return int(sum(len(s) for s in script) * CHAR_SIZE) + navs * NAV_SIZE
+
+def load_level(level):
+    """Resolve a level number, level dict or raw grid into a level dict"""
+    if isinstance(level, int):
+        from levels import read_level
+        return read_level(level)
+    if isinstance(level, dict):
+        return level
+    return {
+        "level": None,
+        "name": "custom grid",
+        "battery": DEFAULT_BATTERY,
+        "executions": DEFAULT_EXECUTIONS,
+        "memory": DEFAULT_MEMORY,
+        "map": level
+    }
+
+def level_grid(level):
+    """A fresh Grid of a level's map, which is either a Grid or maps.py style rows"""
+    if isinstance(level["map"], Grid):
+        return level["map"].copy()
+    return Grid.from_rows(level["map"])
+
+# ====== MISSION ======
+class Mission:
+    """Headless rover mission. Holds all game state and rules, does no I/O and never sleeps.
+
+    Anything worth showing to a player is reported through `listener(event, data)`,
+    which is how the interactive terminal runs on top of the same engine.
+    """
+    def __init__(self, level, seed=None, listener=None):
+        level = load_level(level)
+        self.level = level.get("level")
+        self.name = level.get("name")
+        self.battery = level["battery"]
+        self.memory = level["memory"]
+        self.remaining_memory = self.memory
+        self.executions = level["executions"]
+        self.live_script_size = 0
+        self.sample_onboard = False
+        self.outcome = None
+        self.steps = 0
+        self.op = None  # Last instruction run, a nav as the move it made
+        self.rng = random.Random(seed)
+        self.listener = listener
+        self.dispatch = [self.observe, self.collect, self.drop, self.end]  # Indexed from OP_OBS
+        self.load(compile_script([]))
+        self.place(level)
+
+    def place(self, level):
+        """Set up the terrain and put the rover on the level's [R]"""
+        # The grid only holds terrain, the rover is tracked by position
+        self.grid = level_grid(level)
+        self.rover_pos = self.grid.find(ROVER)[0]
+        self.grid.set(self.rover_pos, FLOOR)
+        samples, bases = self.grid.find(SAMPLE), self.grid.find(BASE)
+        self.sample_pos = samples[0] if samples else None
+        self.base_pos = bases[0] if bases else None
+
+    def emit(self, event, **data):
+        if self.listener is not None:
+            self.listener(event, data)
+
+    def finish(self, outcome):
+        """End the mission with the given outcome"""
+        if self.outcome is None:
+            self.outcome = outcome
+            self.emit(outcome)
+
+    @property
+    def positions(self):
+        """Positions with a rover on them, for drawing"""
+        return (self.rover_pos,)
+
+    @property
+    def tile(self):
+        """Code of the tile under the rover"""
+        return self.grid.get(self.rover_pos)
+
+    def bonus(self):
+        """Credits earned for the memory left over by the last script"""
+        return (self.memory - self.live_script_size) * COST_PER_BYTE
+
+    def state(self):
+        return {
+            "level": self.level,
+            "position": self.rover_pos,
+            "battery": self.battery,
+            "sample": self.sample_onboard,
+            "outcome": self.outcome,
+            "steps": self.steps,
+            "executions": self.executions,
+            "remaining_memory": self.remaining_memory,
+            "script_size": self.live_script_size
+        }
+
+    def snapshot(self):
+        """Everything needed to resume the mission from this exact point, rng included"""
+        return {
+            "battery": self.battery,
+            "remaining_memory": self.remaining_memory,
+            "executions": self.executions,
+            "live_script_size": self.live_script_size,
+            "sample_onboard": self.sample_onboard,
+            "outcome": self.outcome,
+            "steps": self.steps,
+            "rover_pos": self.rover_pos,
+            "tiles": bytes(self.grid.tiles),
+            "rng": self.rng.getstate(),
+            "program": self.program,
+            "pc": self.pc,
+            "loops": list(self.loops)
+        }
+
+    def restore(self, snapshot):
+        """Go back (or forward) to a snapshot taken from this mission"""
+        for key in ("battery", "remaining_memory", "executions", "live_script_size", "sample_onboard", "outcome", "steps", "rover_pos", "program", "pc"):
+            setattr(self, key, snapshot[key])
+        self.grid.tiles[:] = snapshot["tiles"]
+        self.grid.changed.clear()
+        self.grid.fields.clear()
+        self.rng.setstate(snapshot["rng"])
+        self.loops = list(snapshot["loops"])
+
+    # ====== EXECUTION ======
+    def execute_script(self, script):
+        """Submit a script and run it to the end"""
+        if self.submit(script):
+            self.run()
+            self.finish_script()
+
+    def submit(self, script):
+        """Compile a script and charge it against memory and executions. Returns False if it didn't fit"""
+        program = compile_script(script)
+        for line, ins in program.warnings:
+            self.emit("unknown", line=line, ins=ins)
+
+        size = script_size(script)
+        self.live_script_size = size
+        self.executions -= 1
+
+        if size > self.remaining_memory:
+            self.emit("overflow", size=size, available=self.remaining_memory)
+            self.finish_script()
+            return False
+
+        self.remaining_memory -= size
+        self.emit("loaded", size=size)
+        self.load(program)
+        return True
+
+    def finish_script(self):
+        """Called once a script is done. Without executions left the mission is over"""
+        if self.outcome is None and self.executions <= 0:
+            self.finish(EXECUTIONS)
+
+    def load(self, program):
+        self.program = program
+        self.pc = 0
+        self.loops = []
+
+    def run(self):
+        """Run the loaded program until it ends or the mission is over"""
+        while self.outcome is None and self.step():
+            pass
+
+    def step(self):
+        """Follow control flow up to and including the next instruction. Returns False once the program is done.
+
+        A loop pass that gets back to its `next` without running an instruction changed nothing, so
+        every pass after it would do the same: the loop is left there instead of spinning through
+        the rest of its count. That keeps one call linear in the size of the program.
+        """
+        code = self.program.code
+        end = len(self.program)
+        passes = set()  # Loop bodies (their first op) that started a pass during this call
+        while self.pc < end:
+            at = self.pc * 3
+            op, a, b = code[at], code[at + 1], code[at + 2]
+            self.pc += 1
+
+            if op < OP_FOR:
+                self.execute(op)
+                return True
+            elif op == OP_FOR:
+                if a > 0:
+                    self.loops.append(a)
+                    passes.add(self.pc)
+                else:
+                    self.pc = b
+            elif op == OP_NEXT:
+                self.loops[-1] -= 1
+                if self.loops[-1] > 0 and a not in passes:
+                    self.pc = a
+                    passes.add(a)
+                else:
+                    self.loops.pop()
+            elif op == OP_IF:
+                if not self.handle_if(self.program.conditions[a]):
+                    self.pc = b
+            elif op == OP_JMP:
+                self.pc = a
+            elif op == OP_NAV:
+                move = self.grid.route(self.rover_pos, a)
+                if move is None:
+                    # Already there or no known way: the nav still takes a turn, doing nothing
+                    if self.grid.distance(self.rover_pos, a) is None:
+                        self.emit("no_route", target=tile_cell(a))
+                    self.execute(OP_NOP)
+                    return True
+                if self.grid.distance(self.grid.neighbor(self.rover_pos, DELTAS[move]), a):
+                    self.pc -= 1  # Stay on the nav until the move that gets the rover there
+                self.execute(move)
+                return True
+        return False
+
+    def execute(self, op):
+        """Run one instruction: pay for it, do it, then resolve the tile the rover ends up on"""
+        self.steps += 1
+        self.op = op
+        if op != OP_NOP:
+            self.battery -= ENERGY_PER_MOVE  # Deduct energy for every command
+            if op <= OP_MVW:
+                self.move(DELTAS[op])
+            else:
+                self.dispatch[op - OP_OBS]()
+
+        if self.outcome is None:
+            # Handle special block actions AFTER updating position
+            self.handle_action(self.tile)
+        if self.outcome is None and self.battery <= 0:
+            self.finish(POWER)
+        self.emit("step", op=op)
+
+    def move(self, delta):
+        new_pos = self.grid.neighbor(self.rover_pos, delta)
+        if new_pos is None:
+            self.finish(OUT_OF_BOUNDS)
+        else:
+            self.rover_pos = new_pos
+
+    def observe(self):
+        self.emit("scan", block=tile_cell(self.tile))
+
+    def collect(self):
+        if self.tile == SAMPLE:
+            self.grid.set(self.rover_pos, FLOOR)  # Convert to path
+            self.sample_onboard = True
+            self.emit("collect")
+        else:
+            self.emit("collect_failed")
+
+    def drop(self):
+        if self.tile == BASE and self.sample_onboard:
+            self.sample_onboard = False
+            self.emit("deliver", bonus=self.bonus())
+            self.finish(COMPLETE)
+        elif self.sample_onboard:
+            self.emit("deliver_elsewhere")
+        else:
+            self.emit("deliver_empty")
+
+    def end(self):
+        pass  # Costs energy like any other command
+
+    def handle_if(self, condition):
+        """Evaluate a compiled if-statement condition"""
+        left, compare, right = condition
+        try:
+            return compare(self.get_value(left), self.get_value(right))
+        except TypeError:
+            return False  # e.g. comparing a tile with a number
+
+    def get_value(self, operand):
+        kind, value = operand
+        match kind:
+            case "CONST":
+                return value
+            case "BATTERY":
+                return self.battery
+            case "MEMORY":
+                return self.memory
+            case "EXECUTIONS":
+                return self.executions
+            case "LEVEL":
+                return self.level
+            case "CURRENT_BLOCK":
+                return chr(self.tile)
+            case "LOOK":
+                return self.simulate_block(value)
+            case "DIST":
+                return self.grid.distance(self.rover_pos, value)
+
+    def simulate_block(self, move):
+        """Tile one move away, without moving"""
+        pos = self.grid.neighbor(self.rover_pos, DIRECTIONS[move])
+        return chr(self.grid.get(pos)) if pos is not None else None
+
+    def handle_action(self, tile):
+        if tile == UNKNOWN:
+            # Always convert [?] to [X] after exploration
+            self.grid.set(self.rover_pos, FLOOR)
+
+            outcome = self.rng.choice(["positive", "negative"])
+            if outcome == "positive":
+                charge = min(15, 100 - self.battery)
+                self.battery += charge
+                self.emit("flare", charge=charge)
+            else:
+                drain = self.rng.randint(5, 20)
+                self.battery = max(0, self.battery - drain)
+                self.emit("interference", drain=drain)
+
+        elif tile == CHARGER:
+            # Always charge at charging stations
+            charge_amount = min(25, 100 - self.battery)
+            self.battery += charge_amount
+            self.emit("charge", charge=charge_amount)
+
+        elif tile == WALL:
+            self.finish(CRASHED)
+
+# ====== HEADLESS ENTRY POINT ======
+def simulate(level, script, seed=None):
+    """Run a script against a level number, level dict or grid and return the final state"""
+    if isinstance(script, str):
+        script = script.splitlines()
+    mission = Mission(level, seed=seed)
+    mission.execute_script(script)
+    return mission.state()
+
+def split_blocks(script):
+    """Split script lines into execution blocks the way write_script reads them: each ends at an 'end' line"""
+    blocks, block = [], []
+    for ins in script:
+        block.append(ins)
+        if ins == "end":
+            blocks.append(block)
+            block = []
+    if block:
+        blocks.append(block)
+    return blocks
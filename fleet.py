@@ -0,0 +1,318 @@
+import argparse
+import random
+import re
+import time
+
+from compiler import OP_MVW, commands
+from engine import Mission, load_level, level_grid, COMPLETE, CRASHED, OUT_OF_BOUNDS, POWER, EXECUTIONS
+from grid import Grid, DELTAS, FLOOR, WALL, BASE, SAMPLE, ROVER, UNKNOWN, CHARGER
+from renderer import Renderer
+
+# Seconds per tick when watching, the same pause the game makes per instruction
+TICK_DELAY: float = 0.3
+
+# Rovers that stop with these outcomes stay where they are and block the tile. The others
+# have docked at base, driven off the map or ended up in a wall.
+PARKED = (POWER, EXECUTIONS)
+
+# A fleet that stops short of its samples ends the worst way any of its rovers did, in this order
+FAILURES = [CRASHED, OUT_OF_BOUNDS, POWER, EXECUTIONS]
+
+# ====== ROVER ======
+class Rover(Mission):
+    """One rover of a fleet, running its own script on the fleet's shared grid.
+
+    step() only fetches the next instruction into `pending`. The fleet decides whether it
+    runs this tick, waits for the next one, or bumps into something and stays put.
+    """
+    def __init__(self, fleet, number, position, level, seed=None, listener=None):
+        self.fleet = fleet
+        self.number = number
+        self.start = position
+        self.pending = None
+        self.bumped = False
+        super().__init__(level, seed=seed, listener=listener)
+
+    def place(self, level):
+        self.grid = self.fleet.grid
+        self.rover_pos = self.start
+        self.sample_pos = self.fleet.sample_pos
+        self.base_pos = self.fleet.base_pos
+
+    def emit(self, event, **data):
+        if self.listener is not None:
+            data["rover"] = self.number
+            self.listener(event, data)
+
+    def execute(self, op):
+        self.pending = op
+
+    def perform(self, bump=False):
+        """Run the pending instruction. A bumped move is paid for but leaves the rover where it is"""
+        op, self.pending = self.pending, None
+        self.bumped = bump
+        super().execute(op)
+
+    def move(self, delta):
+        if self.bumped:
+            self.emit("bump")
+        else:
+            super().move(delta)
+
+# ====== FLEET ======
+class Fleet:
+    """Several rovers on one map, each with its own script, advanced one instruction per tick.
+
+    Every [R] on the level is a rover, numbered in row order, and all running rovers take their
+    next instruction at the same time:
+    - several rovers moving onto one tile: the lowest numbered one goes, the others wait
+    - moving onto a rover that stays where it is: wait, which is how rovers queue at a charger
+    - moving onto a rover that has stopped for good: bump, paying for the move without making it
+    - rovers waiting on each other in a circle, two swapping tiles being the smallest: all bump
+    Waiting is free and the instruction is tried again next tick. The work per tick grows with
+    the number of running rovers, not with the map. The fleet completes once every sample on
+    the map has been delivered; a rover that delivers one docks and leaves the map. Otherwise it
+    ends once no rover is running, with the first of FAILURES that some rover ended with.
+    """
+    def __init__(self, level, scripts, seed=None, listener=None):
+        level = load_level(level)
+        self.grid = level_grid(level)
+        starts = self.grid.find(ROVER)
+        if len(scripts) != len(starts):
+            raise ValueError(f"the map has {len(starts)} rovers but {len(scripts)} scripts were given")
+        for pos in starts:
+            self.grid.set(pos, FLOOR)
+        samples, bases = self.grid.find(SAMPLE), self.grid.find(BASE)
+        self.sample_pos = samples[0] if samples else None
+        self.base_pos = bases[0] if bases else None
+        self.samples = len(samples)
+        self.delivered = 0
+        self.outcome = None
+        self.ticks = 0
+        self.listener = listener
+
+        level = dict(level, executions=1)  # Each rover runs the one script it was given
+        self.rovers = [
+            Rover(self, number, pos, level, seed=f"{seed}:{number}" if seed is not None else None, listener=listener)
+            for number, pos in enumerate(starts)
+        ]
+        self.occupied = {rover.rover_pos: rover for rover in self.rovers}
+        for rover, script in zip(self.rovers, scripts):
+            rover.submit(script)
+        self.active = [rover for rover in self.rovers if rover.outcome is None]
+        self.settle()
+
+    def finish(self, outcome):
+        self.outcome = outcome
+        if self.listener is not None:
+            self.listener(outcome, {"rover": None})
+
+    def settle(self):
+        """End the fleet once every sample is home or no rover is left running"""
+        if self.samples and self.delivered == self.samples:
+            self.finish(COMPLETE)
+        elif not self.active:
+            ended = {rover.outcome for rover in self.rovers}
+            self.finish(next((outcome for outcome in FAILURES if outcome in ended), EXECUTIONS))
+
+    @property
+    def positions(self):
+        return self.occupied.keys()
+
+    def outcomes(self):
+        """How many rovers ended each way, None for the ones still running"""
+        counts = {}
+        for rover in self.rovers:
+            counts[rover.outcome] = counts.get(rover.outcome, 0) + 1
+        return counts
+
+    def state(self):
+        return {
+            "outcome": self.outcome,
+            "outcomes": self.outcomes(),
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "delivered": self.delivered,
+            "running": len(self.active),
+            "rovers": [rover.state() for rover in self.rovers]
+        }
+
+    # ====== SCHEDULER ======
+    def run(self):
+        while self.tick():
+            pass
+
+    def tick(self):
+        """Advance every running rover by one instruction. Returns False once the fleet is done"""
+        if self.outcome is not None:
+            return False
+        grid, occupied = self.grid, self.occupied
+
+        running = []
+        claims = {}  # Tile -> the rover that gets to move onto it
+        targets = {}  # Rover -> the tile it claimed
+        waiting = set()
+        waits_on = {}  # Waiting rover -> the rover in its way
+        leaving = set()  # Rovers driving off the map
+        for rover in self.active:
+            if rover.pending is None and not rover.step():
+                rover.finish_script()
+                continue
+            running.append(rover)
+            op = rover.pending
+            if op > OP_MVW:
+                continue
+            target = grid.neighbor(rover.rover_pos, DELTAS[op])
+            if target is None:
+                leaving.add(rover)
+            elif target in claims:
+                waiting.add(rover)  # A lower numbered rover got there first
+                waits_on[rover] = claims[target]
+            else:
+                claims[target] = rover
+                targets[rover] = target
+
+        # A move goes ahead if its tile is free or the rover on it is moving away
+        bumps = set()
+        held = []
+        for target, rover in claims.items():
+            other = occupied.get(target)
+            if other is None or other in leaving:
+                continue
+            if other.outcome is not None or targets.get(other) == rover.rover_pos:
+                bumps.add(rover)
+            elif other not in targets:
+                waiting.add(rover)
+                waits_on[rover] = other
+            else:
+                continue
+            held.append(rover)
+        # Rovers that keep their tile hold up whoever was moving onto it, and so on down the line
+        stopped = set(held)
+        while held:
+            rover = held.pop()
+            follower = claims.get(rover.rover_pos)
+            if follower is not None and follower not in stopped:
+                stopped.add(follower)
+                waiting.add(follower)
+                waits_on[follower] = rover
+                held.append(follower)
+
+        # Follow who waits on whom. A circle would wait forever, so everyone in it bumps
+        seen = set()
+        for rover in running:
+            path = {}
+            while rover in waiting and rover not in seen and rover not in path:
+                path[rover] = len(path)
+                rover = waits_on[rover]
+            if rover in path:
+                for stuck in list(path)[path[rover]:]:
+                    waiting.discard(stuck)
+                    bumps.add(stuck)
+            seen.update(path)
+
+        go = []
+        for rover in running:
+            if rover in waiting:
+                rover.emit("wait")
+            else:
+                go.append(rover)
+
+        # Free every tile that is being left before taking the new ones, so rovers can follow each other
+        moved = []
+        for rover in go:
+            before = rover.rover_pos
+            rover.perform(rover in bumps)
+            if rover.outcome == COMPLETE:
+                self.delivered += 1
+            if rover.rover_pos != before or (rover.outcome is not None and rover.outcome not in PARKED):
+                del occupied[before]
+                moved.append(rover)
+        for rover in moved:
+            if rover.outcome is None or rover.outcome in PARKED:
+                occupied[rover.rover_pos] = rover
+
+        if go:
+            self.ticks += 1
+        self.active = [rover for rover in running if rover.outcome is None]
+        self.settle()
+        return self.outcome is None
+
+# ====== RANDOM FLEETS ======
+def random_fleet(rovers, size, seed=0, length=200):
+    """Open size x size map with scattered terrain, and a random walk script per rover"""
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    tiles = grid.tiles
+    for i in range(len(tiles)):
+        roll = rng.random()
+        if roll < 0.08:
+            tiles[i] = WALL
+        elif roll < 0.09:
+            tiles[i] = CHARGER
+        elif roll < 0.1:
+            tiles[i] = UNKNOWN
+    spots = rng.sample(range(len(tiles)), rovers + max(1, rovers // 10) + 1)
+    for i in spots[:rovers]:
+        tiles[i] = ROVER
+    for i in spots[rovers:-1]:
+        tiles[i] = SAMPLE
+    tiles[spots[-1]] = BASE
+    level = {"level": None, "name": "random fleet", "battery": 100, "memory": 10 ** 6, "executions": 1, "map": grid}
+    scripts = [[rng.choice(commands[:4] + ["obs"]) for _ in range(length)] for _ in range(rovers)]
+    return level, scripts
+
+def read_map(path):
+    """Map file with one row of '[X]' cells per line"""
+    with open(path) as f:
+        rows = [re.findall(r"\[.\]", line) for line in f]
+    return [row for row in rows if row]
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Run several rovers on one map, each with its own script")
+    parser.add_argument("scripts", nargs="*", help="script files for the rovers in row order, the last one is reused for the rest")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--map", help="map file with one row of [X] cells per line, instead of a level")
+    parser.add_argument("--random", type=int, metavar="ROVERS", help="time this many random walking rovers instead")
+    parser.add_argument("--size", type=int, default=100, help="map size for --random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--watch", action="store_true", help="draw the map every tick")
+    args = parser.parse_args()
+
+    if args.random:
+        level, scripts = random_fleet(args.random, args.size, args.seed)
+    else:
+        if not args.scripts:
+            parser.error("give a script file for the rovers, or --random")
+        level = load_level(Grid.from_rows(read_map(args.map)) if args.map else args.level)
+        count = len(level_grid(level).find(ROVER))
+        scripts = []
+        for path in (args.scripts + args.scripts[-1:] * count)[:count]:
+            with open(path) as f:
+                scripts.append(f.read().splitlines())
+
+    fleet = Fleet(level, scripts, seed=args.seed)
+    start = time.perf_counter()
+    renderer = Renderer() if args.watch else None
+    show = lambda: renderer.draw(fleet, [f"Tick {fleet.ticks}", f"Rovers running: {len(fleet.active)}", f"Samples delivered: {fleet.delivered}/{fleet.samples}"])
+    while fleet.outcome is None:
+        if renderer:
+            show()
+            time.sleep(TICK_DELAY)
+        fleet.tick()
+    if renderer:
+        show()
+    elapsed = time.perf_counter() - start
+
+    state = fleet.state()
+    instructions = sum(rover["steps"] for rover in state["rovers"])
+    print(f"{len(fleet.rovers)} rovers, {fleet.ticks} ticks, {instructions:,} instructions in {elapsed:.2f}s")
+    if not args.watch:
+        print(f"{fleet.ticks / elapsed:,.0f} ticks/s, {instructions / elapsed:,.0f} instructions/s")
+    print(f"Outcome: {fleet.outcome}, {fleet.delivered}/{fleet.samples} samples delivered")
+    for outcome, count in state["outcomes"].items():
+        print(f"  {outcome or 'running':<14} {count:>6}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import random
+import time
+
+from engine import load_level, script_size, DEFAULT_BATTERY, ENERGY_PER_MOVE
+from grid import Grid, distances, FLOOR, WALL, BASE, SAMPLE, ROVER, UNKNOWN, CHARGER
+from levels import level_numbers
+
+# Names for generated sectors
+SECTORS = ["Alpha", "Beta", "Gamma", "Delta", "Epsilon", "Zeta", "Theta", "Kappa", "Sigma", "Omega"]
+TERRAIN = ["dunes", "crater", "ridge", "basin", "canyon", "plateau", "ice field", "badlands"]
+
+# Attempts at a seed before giving up on it
+MAX_ATTEMPTS: int = 50
+
+def layout(rng, height, width, walls, unknowns, chargers, difficulty):
+    """Random terrain with R, S and B on floor tiles, or None if the rover is walled in.
+
+    S and B are picked by walking distance, not at random, so each leg is long enough to be
+    interesting and short enough for one battery; difficulty pushes them further apart.
+    """
+    grid = Grid(height, width)
+    tiles = grid.tiles
+    for i in range(len(tiles)):
+        if rng.random() < walls:
+            tiles[i] = WALL
+    free = [i for i in range(len(tiles)) if tiles[i] == FLOOR]
+    if not free:
+        return None
+
+    # Moves one leg may take: a full battery pays for 100 / 2 instructions, shared by two legs
+    reach = (DEFAULT_BATTERY // ENERGY_PER_MOVE - 2) // 2
+    low, high = int(reach * (0.25 + 0.5 * difficulty)), int(reach * (0.5 + 0.5 * difficulty))
+
+    start = rng.choice(free)
+    tiles[start] = ROVER
+    sample = leg(rng, grid, start, low, high)
+    if sample is None:
+        return None
+    tiles[sample] = SAMPLE
+    base = leg(rng, grid, sample, low, high)
+    if base is None:
+        return None
+    tiles[base] = BASE
+
+    free = [i for i in free if tiles[i] == FLOOR]
+    picks = rng.sample(free, min(len(free), unknowns + chargers))
+    for code, i in zip([UNKNOWN] * unknowns + [CHARGER] * chargers, picks):
+        tiles[i] = code
+    return grid
+
+def leg(rng, grid, source, low, high):
+    """A floor tile between low and high moves away from source, or None"""
+    dist = distances(grid, [source])
+    tiles = grid.tiles
+    ends = [i for i, d in enumerate(dist) if low <= d <= high and tiles[i] == FLOOR]
+    if not ends:
+        ends = [i for i, d in enumerate(dist) if 0 < d <= high and tiles[i] == FLOOR]
+    return rng.choice(ends) if ends else None
+
+def budget(route, difficulty):
+    """Memory and executions for a solved route. Harder levels leave less room over the best script"""
+    from compress import compress
+    lines = compress(route["moves"])
+    slack = 1 + 0.5 * (1 - difficulty)
+    memory = int(script_size(lines + ["end"]) * slack)
+    memory -= memory % 8
+    executions = 1 + round(2 * (1 - difficulty))
+    return lines, memory, executions
+
+def generate(seed, height=16, width=10, walls=0.3, unknowns=2, chargers=1, difficulty=0.5, number=None):
+    """A level dict in the same shape as maps.maps, checked to be winnable within its budget.
+
+    Difficulty, from 0 to 1, shortens the battery to what the best route needs and takes away
+    spare memory and executions. A layout is kept only if the solver finds a route through it,
+    pricing every [?] as the worst case, and that route compresses into the memory it's given.
+    """
+    # Only generated sectors need these, so loading a hand-made level doesn't import them
+    from compress import split
+    from solver import solve
+    rng = random.Random(seed)
+    for _ in range(MAX_ATTEMPTS):
+        grid = layout(rng, height, width, walls, unknowns, chargers, difficulty)
+        if grid is None:
+            continue
+
+        level = {"level": number, "name": None, "battery": 100, "executions": 1, "memory": 0, "map": grid}
+        route = solve(level)
+        if route is None:
+            continue
+
+        # Battery the route can't go below, and how much of the rest difficulty takes away
+        spare = min(route["battery"][:-1], default=100) - 1
+        # Starting lower only ever lowers the battery along the route, so it stays winnable
+        level["battery"] = 100 - int(spare * difficulty)
+
+        lines, level["memory"], level["executions"] = budget(route, difficulty)
+        if not split(lines, level["memory"], level["executions"]):
+            continue
+
+        level["name"] = f"{rng.choice(SECTORS)}-{rng.randint(1, 99)} {rng.choice(TERRAIN)}"
+        level["map"] = grid.rows()
+        return level
+    raise ValueError(f"no solvable {height}x{width} level for seed {seed} in {MAX_ATTEMPTS} attempts")
+
+def sector(number):
+    """Level `number` of the campaign: the hand-made ones while they last, then generated ones for good"""
+    if number in level_numbers():
+        return load_level(number)
+    return generate(number, difficulty=min(1.0, 0.25 + 0.05 * number), number=number)
+
+# ====== COMMAND LINE ======
+def generate_job(job):
+    seed, options = job
+    return generate(seed, **options)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seeded levels that are checked to be winnable within their budget")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first level, the rest count up from it")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--height", type=int, default=16)
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--walls", type=float, default=0.3, help="share of tiles that are walls")
+    parser.add_argument("--unknowns", type=int, default=2, help="number of [?] tiles")
+    parser.add_argument("--chargers", type=int, default=1, help="number of [@] tiles")
+    parser.add_argument("--difficulty", type=float, default=0.5, help="0 (roomy) to 1 (tightest budget)")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    options = {"height": args.height, "width": args.width, "walls": args.walls, "unknowns": args.unknowns,
+               "chargers": args.chargers, "difficulty": args.difficulty}
+    jobs = [(seed, options) for seed in range(args.seed, args.seed + args.count)]
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        from multiprocessing import Pool
+        with Pool(args.workers) as pool:
+            levels = pool.map(generate_job, jobs, chunksize=16)
+    else:
+        levels = [generate_job(job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    level = levels[0]
+    print(f"{level['name']}: battery {level['battery']}%, memory {level['memory']} bytes, {level['executions']} execution(s)")
+    if args.height * args.width <= 2500:
+        for row in level["map"]:
+            print(" ".join(row))
+    print(f"{len(levels)} levels in {elapsed:.2f}s, {len(levels) / elapsed * 60:,.0f} per minute")
+
+if __name__ == '__main__':
+    main()
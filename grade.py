@@ -0,0 +1,147 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from engine import Mission, level_grid, split_blocks, COMPLETE
+from generator import sector
+from levels import level_numbers
+
+# Instructions a submission may run on one level. Unknown instructions cost no battery, so
+# without a limit a long enough for loop of them would never end. Every step() runs one
+# instruction and, as loops that run nothing are left on the spot, follows at most the
+# program's control flow to get there, so this bounds the time a submission can take too.
+MAX_STEPS: int = 10000
+STEP_LIMIT = "step_limit"
+
+# Columns of the CSV report, one row per script and level
+FIELDS = ["script", "level", "success", "outcome", "bytes_used", "executions_used", "battery", "bonus", "steps", "error"]
+
+# ====== GRADING ======
+def grade(level, blocks, seed):
+    """Play a submission's execution blocks on a level, as the game would, and score it"""
+    mission = Mission(level, seed=seed)
+    for block in blocks:
+        if mission.outcome is not None:
+            break
+        # execute_script, with a cap on the instructions
+        if mission.submit(block):
+            while mission.outcome is None and mission.steps < MAX_STEPS and mission.step():
+                pass
+            if mission.steps >= MAX_STEPS and mission.outcome is None:
+                mission.finish(STEP_LIMIT)
+            mission.finish_script()
+
+    complete = mission.outcome == COMPLETE
+    return {
+        "level": level["level"],
+        "success": complete,
+        "outcome": mission.outcome or "unfinished",
+        "bytes_used": mission.memory - mission.remaining_memory,
+        "executions_used": level["executions"] - mission.executions,
+        "battery": mission.battery,
+        "bonus": mission.bonus() if complete else 0.0,
+        "steps": mission.steps,
+        "error": None
+    }
+
+_levels = []
+_seed = 0
+
+def _start_worker(levels, seed):
+    global _levels, _seed
+    _levels, _seed = levels, seed
+
+def grade_file(path):
+    """Every selected level for one script file. Runs in a worker"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            blocks = split_blocks(f.read().splitlines())
+    except (OSError, UnicodeDecodeError) as e:
+        return [{"script": path, "level": level["level"], "success": False, "error": str(e)} for level in _levels]
+    # Everyone plays a level with the same seed, so [?] tiles are equally kind to all
+    return [dict(grade(level, blocks, f"{_seed}:{level['level']}"), script=path) for level in _levels]
+
+def grade_all(paths, levels, seed=0, workers=None):
+    """Grade script files against level dicts across a process pool. Rows come back in input order"""
+    # Parse maps once here rather than for every run
+    levels = [dict(level, map=level_grid(level)) for level in levels]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _start_worker(levels, seed)
+        return [row for path in paths for row in grade_file(path)]
+    chunk = max(1, min(64, len(paths) // (workers * 4)))
+    with Pool(workers, initializer=_start_worker, initargs=(levels, seed)) as pool:
+        return [row for rows in pool.imap(grade_file, paths, chunksize=chunk) for row in rows]
+
+def summarize(rows):
+    """Per-script totals, best first: levels passed, then bonus"""
+    scripts = {}
+    for row in rows:
+        script = scripts.setdefault(row["script"], {"script": row["script"], "passed": 0, "bonus": 0.0, "levels": []})
+        script["passed"] += row["success"]
+        script["bonus"] += row.get("bonus", 0.0)
+        script["levels"].append({k: v for k, v in row.items() if k != "script"})
+    return sorted(scripts.values(), key=lambda s: (-s["passed"], -s["bonus"], s["script"]))
+
+# ====== COMMAND LINE ======
+def script_files(paths):
+    """Files as given, directories expanded to the files inside them, sorted"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))))
+        else:
+            found.append(path)
+    return found
+
+def level_range(text):
+    """'1-3,5' -> [1, 2, 3, 5]"""
+    numbers = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        numbers.extend(range(int(first), int(last or first) + 1))
+    return numbers
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade script files against levels without playing them")
+    parser.add_argument("scripts", nargs="+", help="script files or directories of them; blocks ending in 'end' are separate executions")
+    parser.add_argument("--levels", type=level_range, help="levels to grade on, e.g. 1-3,5 (default: the hand-made ones)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for [?] tiles, the same for every script")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--csv", help="write one row per script and level to this file ('-' for stdout)")
+    parser.add_argument("--json", help="write per-script results to this file ('-' for stdout)")
+    args = parser.parse_args()
+
+    paths = script_files(args.scripts)
+    levels = [sector(number) for number in (args.levels or level_numbers())]
+    start = time.perf_counter()
+    rows = grade_all(paths, levels, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    results = summarize(rows)
+
+    if args.csv:
+        f = sys.stdout if args.csv == "-" else open(args.csv, "w", newline="")
+        writer = csv.DictWriter(f, FIELDS, restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+        if f is not sys.stdout:
+            f.close()
+    if args.json:
+        report = {"seed": args.seed, "levels": [level["level"] for level in levels], "scripts": results}
+        if args.json == "-":
+            print(json.dumps(report, indent=2))
+        else:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+
+    out = sys.stderr if "-" in (args.csv, args.json) else sys.stdout
+    print(f"Graded {len(paths)} scripts on {len(levels)} level(s) in {elapsed:.2f}s", file=out)
+    for result in results[:10]:
+        print(f"  {result['passed']:>3}/{len(levels)}  €{result['bonus']:>10,.2f}  {result['script']}", file=out)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+from array import array
+
+# ====== TILE CODES ======
+# A tile is stored as the byte of the letter between its brackets, so "[X]" is b"X"
+FLOOR = ord("X")
+WALL = ord("#")
+BASE = ord("B")
+SAMPLE = ord("S")
+ROVER = ord("R")
+UNKNOWN = ord("?")
+CHARGER = ord("@")
+
+# Row/column deltas, in the same order as the move opcodes
+DELTAS = [(-1, 0), (0, 1), (1, 0), (0, -1)]
+DIRECTIONS = {"mvn": DELTAS[0], "mve": DELTAS[1], "mvs": DELTAS[2], "mvw": DELTAS[3]}
+
+def tile_code(cell):
+    """'[X]' -> code"""
+    return ord(cell[1])
+
+def tile_cell(code):
+    """code -> '[X]'"""
+    return "[" + chr(code) + "]"
+
+# Tiles a distance field won't route through: walls, and [?] until it's been explored
+AVOID = (WALL, UNKNOWN)
+
+# ====== GRID ======
+class Grid:
+    """Map terrain packed one byte per tile, row by row"""
+    def __init__(self, height, width, tiles=None):
+        self.height = height
+        self.width = width
+        self.tiles = bytearray(tiles) if tiles is not None else bytearray([FLOOR]) * (height * width)
+        self.changed = []  # Positions written since a renderer last looked
+        self.fields = {}  # Tile code -> DistanceField to the nearest such tile, built on first use
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a grid from maps.py style rows of '[X]' strings"""
+        width = len(rows[0]) if rows else 0
+        tiles = bytearray(len(rows) * width)
+        i = 0
+        for row in rows:
+            for cell in row:
+                tiles[i] = ord(cell[1])
+                i += 1
+        return cls(len(rows), width, tiles)
+
+    def rows(self):
+        """Back to maps.py style rows of '[X]' strings"""
+        return [[tile_cell(code) for code in self.tiles[r * self.width:(r + 1) * self.width]] for r in range(self.height)]
+
+    def copy(self):
+        return Grid(self.height, self.width, self.tiles)
+
+    def in_bounds(self, pos):
+        return 0 <= pos[0] < self.height and 0 <= pos[1] < self.width
+
+    def get(self, pos):
+        """Tile code at pos, or None outside the map"""
+        r, c = pos
+        if 0 <= r < self.height and 0 <= c < self.width:
+            return self.tiles[r * self.width + c]
+        return None
+
+    def set(self, pos, code):
+        self.tiles[pos[0] * self.width + pos[1]] = code
+        self.changed.append(pos)
+        for field in self.fields.values():
+            field.update(pos)
+
+    def distance(self, pos, code):
+        """Moves from pos to the nearest `code` tile over known terrain, or None if there's no way there"""
+        field = self.fields.get(code)
+        if field is None:
+            field = self.fields[code] = DistanceField(self, code)
+        d = field.dist[pos[0] * self.width + pos[1]]
+        return d if d >= 0 else None
+
+    def route(self, pos, code):
+        """First move (an index into DELTAS) of a shortest known way from pos to the nearest `code` tile.
+        None when pos is one already or there's no way there"""
+        d = self.distance(pos, code)
+        if not d:
+            return None
+        dist = self.fields[code].dist
+        for move, delta in enumerate(DELTAS):
+            step = self.neighbor(pos, delta)
+            if step is not None and dist[step[0] * self.width + step[1]] == d - 1:
+                return move
+
+    def neighbor(self, pos, delta):
+        """Position one step away in direction delta, or None if that's off the map"""
+        r, c = pos[0] + delta[0], pos[1] + delta[1]
+        if 0 <= r < self.height and 0 <= c < self.width:
+            return (r, c)
+        return None
+
+    def find(self, code):
+        """All positions holding the given tile, in row order"""
+        found = []
+        i = self.tiles.find(code)
+        while i != -1:
+            found.append(divmod(i, self.width))
+            i = self.tiles.find(code, i + 1)
+        return found
+
+# ====== DISTANCE FIELDS ======
+def distances(grid, sources, avoid=(WALL,)):
+    """Moves from the nearest source to every tile, walking around `avoid` tiles. -1 where unreachable"""
+    width, height = grid.width, grid.height
+    stride = width + 2
+    # A copy with a wall all around it, so neighbors need no bounds checks. Visited tiles are
+    # walled off too, which makes "can step there" a single byte compare.
+    border = bytes([WALL])
+    walls = bytes(WALL if code in avoid else code for code in range(256))
+    blocked = bytearray(border * stride)
+    for r in range(height):
+        blocked += border + grid.tiles[r * width:(r + 1) * width].translate(walls) + border
+    blocked += border * stride
+
+    dist = array('l', [-1]) * len(blocked)
+    queue = [(i // width + 1) * stride + i % width + 1 for i in sources]
+    for index in queue:
+        dist[index] = 0
+        blocked[index] = WALL
+    for index in queue:
+        d = dist[index] + 1
+        if blocked[index - stride] != WALL:
+            blocked[index - stride] = WALL
+            dist[index - stride] = d
+            queue.append(index - stride)
+        if blocked[index + 1] != WALL:
+            blocked[index + 1] = WALL
+            dist[index + 1] = d
+            queue.append(index + 1)
+        if blocked[index + stride] != WALL:
+            blocked[index + stride] = WALL
+            dist[index + stride] = d
+            queue.append(index + stride)
+        if blocked[index - 1] != WALL:
+            blocked[index - 1] = WALL
+            dist[index - 1] = d
+            queue.append(index - 1)
+
+    result = array('l')
+    for r in range(1, height + 1):
+        result += dist[r * stride + 1:r * stride + 1 + width]
+    return result
+
+class DistanceField:
+    """Moves from every tile to the nearest tile of one kind, over known terrain.
+
+    Kept current by Grid.set. A [?] that turns into floor only updates the tiles it brings
+    closer; losing a target tile (a collected sample) rebuilds the field.
+    """
+    def __init__(self, grid, code):
+        self.grid = grid
+        self.code = code
+        self.build()
+
+    def build(self):
+        grid = self.grid
+        self.sources = {r * grid.width + c for r, c in grid.find(self.code)}
+        self.dist = distances(grid, sorted(self.sources), AVOID)
+
+    def update(self, pos):
+        """Bring the field up to date after the tile at pos changed"""
+        grid, dist = self.grid, self.dist
+        width, height, tiles = grid.width, grid.height, grid.tiles
+        i = pos[0] * width + pos[1]
+        code = tiles[i]
+        if (code == self.code) != (i in self.sources) or (code in AVOID and dist[i] != -1):
+            self.build()
+            return
+        if code in AVOID:
+            return
+
+        # Newly passable: one move further than its nearest neighbor, and it may bring others closer
+        queue = [i]
+        for j in queue:
+            r, c = divmod(j, width)
+            around = [n for n, ok in ((j - width, r > 0), (j + 1, c < width - 1), (j + width, r < height - 1), (j - 1, c > 0)) if ok]
+            if j == i:
+                best = min((dist[n] for n in around if dist[n] >= 0), default=-1)
+                if best == -1 or dist[i] != -1 and dist[i] <= best + 1:
+                    return
+                dist[i] = best + 1
+            d = dist[j] + 1
+            for n in around:
+                if tiles[n] not in AVOID and (dist[n] == -1 or dist[n] > d):
+                    dist[n] = d
+                    queue.append(n)
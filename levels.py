@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from grid import Grid
+
+# ====== FILE FORMAT ======
+# levels.amx, all integers little-endian:
+#   file header   magic "AMXL", version, level count, SHA-256 of the maps.py it was built from
+#   index         one entry per level: level number, record offset, record length
+#   records       header (battery, executions, memory, height, width, name length),
+#                 the name in UTF-8, then one byte per tile, row by row (see grid.py)
+LEVEL_FILE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels.amx")
+MAPS_FILE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps.py")
+
+MAGIC = b"AMXL"
+VERSION = 2
+FILE_HEADER = struct.Struct("<4sHI32s")
+INDEX_ENTRY = struct.Struct("<iQI")
+RECORD_HEADER = struct.Struct("<iiiHHH")
+
+# Open level files: path -> (mmap, {level number: (offset, length)}, maps.py digest)
+_open_files = {}
+# maps.py (size, mtime) -> its digest, so it's only hashed again after it changes
+_maps_digest = {}
+# Level files already reported as stale
+_warned = set()
+
+def maps_digest():
+    """SHA-256 of maps.py, or None if there isn't one"""
+    try:
+        info = os.stat(MAPS_FILE)
+    except OSError:
+        return None
+    key = (info.st_size, info.st_mtime_ns)
+    if key not in _maps_digest:
+        with open(MAPS_FILE, "rb") as f:
+            _maps_digest.clear()
+            _maps_digest[key] = hashlib.sha256(f.read()).digest()
+    return _maps_digest[key]
+
+def pack_level(level):
+    """One level dict -> record bytes"""
+    grid = level["map"] if isinstance(level["map"], Grid) else Grid.from_rows(level["map"])
+    name = (level.get("name") or "").encode()
+    header = RECORD_HEADER.pack(level["battery"], level["executions"], level["memory"], grid.height, grid.width, len(name))
+    return header + name + bytes(grid.tiles)
+
+def write_levels(levels, path=LEVEL_FILE, digest=bytes(32)):
+    """Write level dicts, keyed by level number, into a level file. `digest` is the maps.py they came from"""
+    numbers = sorted(levels)
+    records = [pack_level(levels[number]) for number in numbers]
+    offset = FILE_HEADER.size + INDEX_ENTRY.size * len(records)
+    index = []
+    for number, record in zip(numbers, records):
+        index.append(INDEX_ENTRY.pack(number, offset, len(record)))
+        offset += len(record)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(FILE_HEADER.pack(MAGIC, VERSION, len(records), digest))
+        f.write(b"".join(index))
+        f.write(b"".join(records))
+    os.replace(tmp, path)
+    _open_files.pop(path, None)
+
+def open_levels(path=LEVEL_FILE):
+    """Map a level file and read its index. Only the index is parsed, levels stay on disk"""
+    if path in _open_files:
+        return _open_files[path][:2]
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count, digest = FILE_HEADER.unpack_from(data, 0) if len(data) >= FILE_HEADER.size else (None,) * 4
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} level file")
+    index = {}
+    for i in range(count):
+        number, offset, length = INDEX_ENTRY.unpack_from(data, FILE_HEADER.size + i * INDEX_ENTRY.size)
+        index[number] = (offset, length)
+    _open_files[path] = (data, index, digest)
+    return data, index
+
+def unpack_level(data, number, offset):
+    """Record at offset -> level dict with the map as a Grid"""
+    battery, executions, memory, height, width, name_length = RECORD_HEADER.unpack_from(data, offset)
+    start = offset + RECORD_HEADER.size
+    name = data[start:start + name_length].decode()
+    start += name_length
+    return {
+        "level": number,
+        "name": name,
+        "battery": battery,
+        "executions": executions,
+        "memory": memory,
+        "map": Grid(height, width, data[start:start + height * width])
+    }
+
+def stale(path=LEVEL_FILE):
+    """The level file is missing, unreadable or wasn't built from the maps.py there is now.
+    Says so on stderr the first time, since levels then come from maps.py instead"""
+    if not os.path.exists(path):
+        return True
+    try:
+        open_levels(path)
+    except ValueError as e:
+        reason = str(e)
+    else:
+        digest = maps_digest()
+        if digest is None or digest == _open_files[path][2]:
+            return False
+        reason = f"{os.path.basename(path)} was built from a different maps.py"
+    if path not in _warned:
+        _warned.add(path)
+        print(f"{reason}, loading levels from maps.py. Run `python levels.py` to rebuild it.", file=sys.stderr)
+    return True
+
+def read_level(number, path=LEVEL_FILE):
+    """Load a single level. Falls back to maps.py when the level file is stale or doesn't have it"""
+    if not stale(path):
+        data, index = open_levels(path)
+        if number in index:
+            return unpack_level(data, number, index[number][0])
+    from maps import maps
+    return maps[number]
+
+def level_numbers(path=LEVEL_FILE):
+    """Every level number available, from the level file or maps.py"""
+    if not stale(path):
+        return sorted(open_levels(path)[1])
+    from maps import maps
+    return sorted(maps)
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Convert maps.py into the compact level file the game loads from")
+    parser.add_argument("--out", default=LEVEL_FILE)
+    parser.add_argument("--list", action="store_true", help="list the levels in the file instead of building it")
+    args = parser.parse_args()
+
+    if args.list:
+        data, index = open_levels(args.out)
+        for number, (offset, length) in sorted(index.items()):
+            level = unpack_level(data, number, offset)
+            grid = level["map"]
+            print(f"{number:>4}  {level['name']:<24} {grid.height}x{grid.width}  {length:>8} bytes")
+        return
+
+    from maps import maps
+    write_levels(maps, args.out, maps_digest())
+    print(f"Wrote {len(maps)} levels to {args.out} ({os.path.getsize(args.out)} bytes)")
+
+if __name__ == '__main__':
+    main()
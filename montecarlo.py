@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+from collections import Counter
+from multiprocessing import Pool
+
+from engine import Mission, split_blocks
+
+# ====== SIMULATION ======
+def run_seed(level, blocks, seed):
+    """One playthrough. Returns its outcome, the step it ended on and the battery after every step"""
+    mission = Mission(level, seed=seed)
+    trace = []
+    mission.listener = lambda event, data: trace.append(mission.battery) if event == "step" else None
+    for block in blocks:
+        mission.execute_script(block)
+        if mission.outcome is not None:
+            break
+    return mission.outcome, mission.steps, trace
+
+def run_chunk(job):
+    """Run seeds [start, stop) and fold them into counters, so workers send back a summary, not traces"""
+    level, blocks, base_seed, start, stop = job
+    outcomes = Counter()
+    failures = Counter()
+    battery = []  # battery[step] -> Counter of battery levels after that step
+    for i in range(start, stop):
+        # Every run gets its own seed, so results don't depend on how runs are spread over workers
+        outcome, steps, trace = run_seed(level, blocks, f"{base_seed}:{i}")
+        outcomes[outcome] += 1
+        if outcome != "complete":
+            failures[(outcome, steps)] += 1
+        for step, value in enumerate(trace):
+            if step == len(battery):
+                battery.append(Counter())
+            battery[step][max(0, value)] += 1
+    return outcomes, failures, battery
+
+def evaluate(level, script, runs=100000, seed=0, workers=None):
+    """Run a script `runs` times with independent seeds across a process pool and summarize"""
+    blocks = split_blocks(script)
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, min(5000, runs // (workers * 4) or 1))
+    jobs = [(level, blocks, seed, start, min(runs, start + chunk)) for start in range(0, runs, chunk)]
+
+    outcomes, failures, battery = Counter(), Counter(), []
+    if workers == 1:
+        results = map(run_chunk, jobs)
+        _merge(results, outcomes, failures, battery)
+    else:
+        with Pool(workers) as pool:
+            _merge(pool.imap_unordered(run_chunk, jobs), outcomes, failures, battery)
+
+    return {
+        "runs": runs,
+        "seed": seed,
+        "success": outcomes["complete"] / runs if runs else 0.0,
+        "outcomes": {str(k): v for k, v in outcomes.most_common()},
+        "failures": [{"outcome": str(outcome), "step": step, "runs": count} for (outcome, step), count in failures.most_common(10)],
+        "battery": [_summary(counts) for counts in battery]
+    }
+
+def _merge(results, outcomes, failures, battery):
+    for chunk_outcomes, chunk_failures, chunk_battery in results:
+        outcomes.update(chunk_outcomes)
+        failures.update(chunk_failures)
+        for step, counts in enumerate(chunk_battery):
+            if step == len(battery):
+                battery.append(Counter())
+            battery[step].update(counts)
+
+def _summary(counts):
+    """Distribution of battery levels after one step, over the runs that got that far"""
+    total = sum(counts.values())
+    ordered = sorted(counts.items())
+
+    def percentile(p):
+        target, seen = p * total, 0
+        for value, count in ordered:
+            seen += count
+            if seen >= target:
+                return value
+        return ordered[-1][0]
+
+    return {
+        "runs": total,
+        "mean": sum(value * count for value, count in ordered) / total,
+        "min": ordered[0][0],
+        "p5": percentile(0.05),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "max": ordered[-1][0]
+    }
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Run a script many times against a level over random [?] outcomes")
+    parser.add_argument("script", help="script file; blocks ending in 'end' are separate executions")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    with open(args.script) as f:
+        script = f.read().splitlines()
+    report = evaluate(args.level, script, args.runs, args.seed, args.workers)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Level {args.level}, {report['runs']} runs, seed {report['seed']}")
+    print(f"Success: {report['success']:.2%}")
+    print("Outcomes:")
+    for outcome, count in report["outcomes"].items():
+        print(f"  {outcome:<14} {count:>8}  {count / report['runs']:.2%}")
+    if report["failures"]:
+        print("Most common failures:")
+        for failure in report["failures"]:
+            print(f"  {failure['outcome']:<14} at step {failure['step']:<5} {failure['runs']:>8} runs")
+    print("Battery after each step (p5 / p50 / p95, mean):")
+    for step, s in enumerate(report["battery"], 1):
+        print(f"  {step:>4}: {s['p5']:>3} / {s['p50']:>3} / {s['p95']:>3}  {s['mean']:6.1f}  ({s['runs']} runs)")
+
+if __name__ == '__main__':
+    main()
@@ -1,66 +1,22 @@
+import argparse
+import asyncio
 import random
-import datetime
-import re
-import os
 import sys
 import time
-import select
-from colorama import Fore, Style, init as colorama_init
+from collections import deque
+from colorama import Fore, Style
+from engine import Mission, script_size
+from renderer import Renderer, clear_screen
+from terminal import Terminal
 
 # ====== GLOBAL VARIABLES ======
-NAME: str = None
-ROVER_POS: tuple = None
-SAMPLE_POS: tuple = None
-BASE_POS: tuple = None
-SAMPLE_ONBOARD: bool = False
-LEVEL: int = 1
-GRID: list = []
-CURRENT_BLOCK: str = "[X]"
-CHAR_SIZE: int = 8
-COST_PER_BYTE: float = 1.25
-MEMORY: int = 0
-EXECUTIONS: int = 1
-BATTERY: int = 100
-ENERGY_PER_MOVE: int = 2
-LOGGING_ENABLED: bool = False
+LOGGING_ENABLED: bool = True
 LOG_FILENAME: str = 'missions.log'
-LIVE_SCRIPT_SIZE: int = 0
-REMAINING_MEMORY: int = MEMORY
-INPUT_DISABLED: bool = False  
-
-colorama_init(autoreset=True)
-
-# ====== UTILITY FUNCTIONS ======
-def clear_input_buffer():
-    """Clear any pending input in the buffer"""
-    if os.name == 'nt':
-        import msvcrt
-        while msvcrt.kbhit():
-            msvcrt.getch()
-    else:
-        import termios
-        termios.tcflush(sys.stdin, termios.TCIOFLUSH)
-
-def disable_input():
-    """Disable user input during critical operations"""
-    global INPUT_DISABLED
-    INPUT_DISABLED = True
-    clear_input_buffer()
-
-def enable_input():
-    """Re-enable user input"""
-    global INPUT_DISABLED
-    INPUT_DISABLED = False
-
-def safe_input(prompt):
-    """Input wrapper that respects disabled input state"""
-    while INPUT_DISABLED:
-        time.sleep(0.1)
-    clear_input_buffer()
-    return input(prompt)
-
-def strip_ansi(text):
-    return re.sub(r'\x1B[@-_][0-?]*[ -/]*[@-~]', '', text)
+STATS_ENABLED: bool = True
+STATS_FILENAME: str = 'missions.db'
+# Seconds to wait for the rest of a pasted script before prompting for the next line
+PASTE_SETTLE: float = 0.02
+LOAD_COMMAND: str = ":load"
 
 # ====== MESSAGE CLASS ======
 class Mess:
@@ -119,399 +75,497 @@ class Mess:
 
 # ====== LOADBAR CLASS ======
 class Loadbar:
-    @staticmethod
-    def _bar(duration: float, color: str):
+    def __init__(self, session):
+        self.session = session
+
+    async def _bar(self, duration: float, color: str):
+        out = self.session.out
         bar = "[" + " " * 20 + "]"
-        disable_input()
         for i in range(1, 21):
             bar = bar[:i] + "#" + bar[i+1:]
-            sys.stdout.write(color + "\r" + bar)
-            sys.stdout.flush()
-            time.sleep(duration / 20)
-        print()
-        enable_input()
-
-    @staticmethod
-    def GREEN(duration: float):
-        Loadbar._bar(duration, Fore.GREEN)
-
-    @staticmethod
-    def YELLOW(duration: float):
-        Loadbar._bar(duration, Fore.YELLOW)
-
-    @staticmethod
-    def RED(duration: float):
-        Loadbar._bar(duration, Fore.RED)
-
-    @staticmethod
-    def CYAN(duration: float):
-        Loadbar._bar(duration, Fore.CYAN)
-
-# ====== GAME COMMANDS ======
-commands = [
-    "mvn",
-    "mve",
-    "mvs",
-    "mvw",
-    "obs",
-    "clt",
-    "drp",
-    "end"
+            out.write(color + "\r" + bar)
+            out.flush()
+            await self.session.pause(duration / 20)
+        self.session.print(Style.RESET_ALL)
+
+    async def GREEN(self, duration: float):
+        await self._bar(duration, Fore.GREEN)
+
+    async def YELLOW(self, duration: float):
+        await self._bar(duration, Fore.YELLOW)
+
+    async def RED(self, duration: float):
+        await self._bar(duration, Fore.RED)
+
+    async def CYAN(self, duration: float):
+        await self._bar(duration, Fore.CYAN)
+
+terrain_descriptions = [
+    "Dusty gravel field",
+    "Rocky outcrop showing iron deposits",
+    "Fine sand dunes shifting in the wind",
+    "Cracked clay surface with mineral veins",
+    "Basalt formations from ancient lava flows",
+    "Impact crater debris field",
+    "Crystalline formations glittering in starlight"
 ]
 
-# ====== GAME INITIALIZATION ======
-def init_game():
-    global NAME
-    os.system('cls' if os.name == 'nt' else 'clear')
-
-    print(Mess.system("Initializing Amethyx Mission Terminal..."))
-    time.sleep(1.2)
-    print(Mess.system("Establishing quantum link..."))
-    Loadbar.CYAN(1.5)
-
-    print()
-    NAME = safe_input(Mess.title("Operator name: "))
-    print()
-    print(Mess.system("Authenticating operator credentials..."))
-    Loadbar.YELLOW(1.2)
-
-    print(Mess.operator(f"Identity confirmed: {NAME}"))
-    time.sleep(1.0)
-    print(Mess.operator("Running security clearance... You'd be surprised how many try to fake these."))
-    Loadbar.YELLOW(1.5)
-    
-    print(Mess.system(f"Operator: {NAME}, Level 3 clearance verified"))
-    time.sleep(1.0)
-    print(Mess.operator("Welcome to the Amethyx Remote Surface Operations program."))
-    time.sleep(1.5)
-    print(Mess.operator("You'll be piloting Rover XM-86 across the surface of Kepler-186f."))
-    time.sleep(1.5)
-    print(Mess.operator("This isn't a simulation - that hardware costs more than a lunar colony."))
-    time.sleep(1.5)
-    print(Mess.operator("Make smart moves. There's no undo button out there."))
-    time.sleep(1.5)
-
-    print()
-    tutorial = safe_input(Mess.operator("Do you need a control refresher? (y/n) ")).strip().lower()
-    print()
-
-    if tutorial == 'n':
-        print(Mess.system("Skipping tutorial sequence..."))
-        Loadbar.YELLOW(1)
-        start_game()
-    else:
-        print(Mess.system("Loading orientation protocol..."))
-        Loadbar.YELLOW(1)
-        start_tutorial()
-
-def start_tutorial():
-    print(Mess.operator("Let's get you familiar with Rover operations..."))
-    time.sleep(1.5)
-    print()
-    print(Mess.operator("Your primary objective: Retrieve mineral samples and return to base."))
-    time.sleep(1.5)
-    print()
-    print(Mess.operator("Navigation commands: mvn (north), mve (east), mvs (south), mvw (west)"))
-    time.sleep(1.5)
-    print()
-    print(Mess.operator("Special commands: obs (scan terrain), clt (collect sample), drp (deliver sample)"))
-    time.sleep(2.0)
-    print()
-    print(Mess.operator("Watch your battery - move carefully. Charging stations [@] are your lifeline."))
-    time.sleep(2.0)
-    print()
-    print(Mess.operator("Unexplored areas [?] can be risky but rewarding. Proceed with caution."))
-    time.sleep(2.0)
-    print()
-    print(Mess.operator("Remember: it's space. Memory onboard is limited. Your code must be efficient or you won't be able to run it."))
-    time.sleep(2.0)
-    print()
-    print(Mess.operator("Each character costs 8 bytes. Normally on your smart lightbulb at home this doesnt matter. "))
-    time.sleep(2.0)
-    print()
-    print(Mess.operator("Here it can cost up to billions worth of equipent. If your code is large, it won't be run until you shorten it. "))
-    time.sleep(2.0)
-    print()
-    print(Mess.operator("Just to remind you of our syntax and design rules:"))
-    time.sleep(2.0)
-    print()
-    print(Mess.operator("Each instruction go in a new line. Just like this:"))
-    time.sleep(1.0)
-    print()
-    print(Mess.hint("mvn # moving north"))
-    time.sleep(1.0)
-    print()
-    print(Mess.hint("mve # moving east"))
-    time.sleep(1.0)
-    print()
-    print(Mess.hint("clt # collect sample"))
-    time.sleep(1.0)
-    print()
-    print(Mess.operator("You can do for loops. Syntax is simple: for 4 >> mve"))
-    time.sleep(1.0)
-    print()
-    print(Mess.operator("This basically moves the rover east 4 times in a row. You can also with other movements like:"))
-    time.sleep(1.0)
-    print()
-    print(Mess.hint("for 3 >> mve, mvw # it will move east, then west and repeat two more times"))
-    time.sleep(1.0)
-    print()
-    print(Mess.operator("You can also do conditional statements like:"))
-    time.sleep(1.0)
-    print()
-    print(Mess.hint("if mve == # then mvn else mve"))
-    time.sleep(1.0)
-    print()
-    print(Mess.operator("This simulates the move to east and if it is an obsticle, it will go north. If safe, it'll go east as planned."))
-    time.sleep(1.0)
-    print()
-    print(Mess.operator("Lots of information but I think you're ready. Good luck out there."))
-    time.sleep(1.5)
-    print()
-    input(Mess.suggestion("Press any key to continue"))
-    start_game()
-
-# ====== GAME CORE FUNCTIONS ======
-def start_game():
-    print(Mess.operator("Transmitting mission parameters..."))
-    time.sleep(1.0)
-    print(Mess.system("Objective: Retrieve mineral sample from designated site"))
-    print(Mess.system("Secondary: Return to base with minimal energy expenditure"))
-    time.sleep(1.5)
-    
-    print(Mess.operator("Establishing satellite uplink..."))
-    Loadbar.CYAN(2.0)
-    
-    print(Mess.success("Rover telemetry: ONLINE"))
-    time.sleep(0.7)
-    print(Mess.system("Coordinates locked: Sector Gamma-" + str(random.randint(10, 99))))
-    time.sleep(1.0)
-    print(Mess.system("Rendering topographic map..."))
-    time.sleep(1.5)
-
-    get_map()
-
-    print(Mess.operator(f"Alright {NAME}, you have control. Make it count."))
-    write_script()
-
-def get_map():
-    global LEVEL, GRID, EXECUTIONS, BATTERY, MEMORY, ROVER_POS, SAMPLE_POS, BASE_POS, REMAINING_MEMORY
-    from maps import maps
-
-    EXECUTIONS = maps[LEVEL]['executions']
-    MEMORY = maps[LEVEL]['memory']
-    REMAINING_MEMORY = MEMORY
-    BATTERY = maps[LEVEL]['battery']
-    GRID = []  # Reset grid
-    
-    raw_map = maps[LEVEL]['map']
-
-    for i, row in enumerate(raw_map):
-        grid_row = []
-        for j, cell in enumerate(row):
-            if cell == "[R]":
-                ROVER_POS = (i, j)
-            elif cell == "[S]":
-                SAMPLE_POS = (i, j)
-            elif cell == "[B]":
-                BASE_POS = (i, j)
-            grid_row.append(cell)
-        GRID.append(grid_row)
-    
-    print_map()
-
-def print_map():
-    global BATTERY
-    os.system('cls' if os.name == 'nt' else 'clear')
-    
-    for row in GRID:
-        line = ''
-        for cell in row:
-            if cell == '[B]':
-                line += Fore.CYAN + cell + Style.RESET_ALL + ' '
-            elif cell == '[S]':
-                line += Fore.GREEN + cell + Style.RESET_ALL + ' '
-            elif cell == '[R]':
-                line += Fore.YELLOW + Style.BRIGHT + cell + Style.RESET_ALL + ' '
-            elif cell == '[#]':
-                line += Fore.RED + Style.BRIGHT + cell + Style.RESET_ALL + ' '
-            elif cell == '[?]':
-                line += Fore.BLUE + Style.BRIGHT + cell + Style.RESET_ALL + ' '
-            elif cell == '[@]':
-                line += Fore.LIGHTBLACK_EX + Style.DIM + cell + Style.RESET_ALL + ' '
-            elif cell == '[*]':
-                line += Fore.CYAN + Style.BRIGHT + cell + Style.RESET_ALL + ' '
-            elif cell == '[X]':
-                line += Fore.LIGHTWHITE_EX + Style.DIM + cell + Style.RESET_ALL + ' '
-            else:
-                line += cell + ' '
-        
-        print(line.rstrip())
-
-    # Battery status with color coding
-    battery_color = Fore.GREEN
-    if BATTERY < 30:
-        battery_color = Fore.RED
-    elif BATTERY < 60:
-        battery_color = Fore.YELLOW
-        
-    print(Mess.system(f"Battery: {battery_color}{BATTERY}%{Style.RESET_ALL}"))
-    print(Mess.system(f"Available memory: {REMAINING_MEMORY} bytes"))
-    print(Mess.system(f"Used memory: {MEMORY - REMAINING_MEMORY} bytes"))
-    print(Mess.system(f"Code executions left: {EXECUTIONS}"))
-
-    if SAMPLE_ONBOARD:
-        print(Mess.success("Sample secured in cargo bay"))
-    else:
-        print(Mess.warning("Sample not collected"))
-
-def write_script():
-    global LIVE_SCRIPT_SIZE, REMAINING_MEMORY, MEMORY
-    script = []
-    i = 1
-    while not 'end' in script:
-        ins = safe_input(f"{i}: ")
-        inssize = int(sum(len(s) for s in ins) * CHAR_SIZE)
-        LIVE_SCRIPT_SIZE = inssize
-        script.append(ins)
-        i += 1
-
-    execute_script(script)
-
-def parse_commands(ins):
-    global ROVER_POS, CURRENT_BLOCK, GRID, SAMPLE_ONBOARD, LEVEL, EXECUTIONS, BATTERY, MEMORY, REMAINING_MEMORY
-    
-    if_match = re.match(r"^\s*(if)\s+(\S+)\s*(==|!=|>|<|>=|<=)\s*(\S+|\'[^']+\'|\"[^\"]+\")\s+(then)\s+(\S+)\s+(else)\s+(\S+)", ins)
-    for_match = re.match(r"^\s*(for)\s+(\d+)\s*(>>)\s*(.+)", ins)
-
-    if if_match:
-        condition = list(if_match.groups())
-        handle_if(condition)
-        return
-    elif for_match:
-        condition = list(for_match.groups()[:3]) + [x.strip() for x in for_match.group(4).split(',')]
-        handle_for(condition)
-        return
-    
-    if ins in commands:
-        BATTERY -= ENERGY_PER_MOVE  # Deduct energy for every command
-        
-        match ins:
-            case "mvn":
-                new_pos = (ROVER_POS[0] - 1, ROVER_POS[1])
-                if 0 <= new_pos[0] < len(GRID) and 0 <= new_pos[1] < len(GRID[0]):
-                    # Convert previous [?] to [X]
-                    if strip_ansi(GRID[ROVER_POS[0]][ROVER_POS[1]]) == "[?]":
-                        GRID[ROVER_POS[0]][ROVER_POS[1]] = "[X]"
-                    
-                    # Clear the old rover position
-                    GRID[ROVER_POS[0]][ROVER_POS[1]] = CURRENT_BLOCK
-                    
-                    # Save new current block
-                    CURRENT_BLOCK = GRID[new_pos[0]][new_pos[1]]
-                    
-                    # Move rover
-                    ROVER_POS = new_pos
-                    GRID[ROVER_POS[0]][ROVER_POS[1]] = "[R]"
-                else:
-                    out_of_bounds()
-
-            case "mve":
-                new_pos = (ROVER_POS[0], ROVER_POS[1] + 1)
-                if 0 <= new_pos[0] < len(GRID) and 0 <= new_pos[1] < len(GRID[0]):
-                    # Convert previous [?] to [X]
-                    if strip_ansi(GRID[ROVER_POS[0]][ROVER_POS[1]]) == "[?]":
-                        GRID[ROVER_POS[0]][ROVER_POS[1]] = "[X]"
-                    
-                    GRID[ROVER_POS[0]][ROVER_POS[1]] = CURRENT_BLOCK
-                    CURRENT_BLOCK = GRID[new_pos[0]][new_pos[1]]
-                    ROVER_POS = new_pos
-                    GRID[ROVER_POS[0]][ROVER_POS[1]] = "[R]"
-                else:
-                    out_of_bounds()
-
-            case "mvs":
-                new_pos = (ROVER_POS[0] + 1, ROVER_POS[1])
-                if 0 <= new_pos[0] < len(GRID) and 0 <= new_pos[1] < len(GRID[0]):
-                    # Convert previous [?] to [X]
-                    if strip_ansi(GRID[ROVER_POS[0]][ROVER_POS[1]]) == "[?]":
-                        GRID[ROVER_POS[0]][ROVER_POS[1]] = "[X]"
-                    
-                    GRID[ROVER_POS[0]][ROVER_POS[1]] = CURRENT_BLOCK
-                    CURRENT_BLOCK = GRID[new_pos[0]][new_pos[1]]
-                    ROVER_POS = new_pos
-                    GRID[ROVER_POS[0]][ROVER_POS[1]] = "[R]"
-                else:
-                    out_of_bounds()
-
-            case "mvw":
-                new_pos = (ROVER_POS[0], ROVER_POS[1] - 1)
-                if 0 <= new_pos[0] < len(GRID) and 0 <= new_pos[1] < len(GRID[0]):
-                    # Convert previous [?] to [X]
-                    if strip_ansi(GRID[ROVER_POS[0]][ROVER_POS[1]]) == "[?]":
-                        GRID[ROVER_POS[0]][ROVER_POS[1]] = "[X]"
-                    
-                    GRID[ROVER_POS[0]][ROVER_POS[1]] = CURRENT_BLOCK
-                    CURRENT_BLOCK = GRID[new_pos[0]][new_pos[1]]
-                    ROVER_POS = new_pos
-                    GRID[ROVER_POS[0]][ROVER_POS[1]] = "[R]"
+# ====== SESSION ======
+class Session:
+    """One operator's game: their name, level, mission, screen and keyboard.
+
+    Nothing is shared between sessions, so one process can host as many as it likes. The
+    terminal supplies input() and the abort key, `out` takes everything written to the screen.
+    `speed` divides every pause, for scripted runs. `files` allows reading scripts from disk
+    with ':load', which remote players shouldn't be able to do. Finished missions go to
+    `stats`, a Stats store that sessions may share. Without `intro` the game skips the
+    welcome, tutorial and briefings and goes straight to each map. `screen` is the player's
+    screen as (columns, lines), for sizing the map view; the local terminal's by default.
+    """
+    def __init__(self, terminal, out=None, log=None, seed=None, speed=1.0, files=True, stats=None, intro=True, screen=None):
+        self.terminal = terminal
+        self.out = out or sys.stdout
+        self.log = log
+        self.rng = random.Random(seed)
+        self.speed = speed
+        self.files = files
+        self.stats = stats
+        self.intro = intro
+        self.name = None
+        self.level = 1
+        self.mission = None
+        self.renderer = Renderer(out=self.out, size=screen)
+        self.recorder = None
+        self.loadbar = Loadbar(self)
+        self.events = deque()  # Engine events waiting to be shown
+        self.started = None  # When the mission began and with how many executions
+        self.scripts = []  # (lines, bytes, steps before it ran) of each script sent this mission
+
+    def print(self, message=""):
+        self.out.write(f"{message}\n")
+        self.out.flush()
+
+    async def input(self, prompt):
+        return await self.terminal.input(prompt)
+
+    async def pause(self, seconds):
+        """Wait without blocking input. While a script is being aborted, waits end at once"""
+        await self.terminal.drain()
+        seconds /= self.speed
+        if self.terminal.watching:
+            try:
+                await asyncio.wait_for(self.terminal.abort.wait(), seconds)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(seconds)
+
+    # ====== GAME INITIALIZATION ======
+    async def init_game(self):
+        clear_screen(self.out)
+        if not self.intro:
+            if self.name is None:
+                self.name = await self.input(Mess.title("Operator name: "))
+            await self.run_game("deploying")
+            return
+
+        self.print(Mess.system("Initializing Amethyx Mission Terminal..."))
+        await self.pause(1.2)
+        self.print(Mess.system("Establishing quantum link..."))
+        await self.loadbar.CYAN(1.5)
+
+        self.print()
+        if self.name is None:
+            self.name = await self.input(Mess.title("Operator name: "))
+        self.print()
+        self.print(Mess.system("Authenticating operator credentials..."))
+        await self.loadbar.YELLOW(1.2)
+
+        self.print(Mess.operator(f"Identity confirmed: {self.name}"))
+        await self.pause(1.0)
+        self.print(Mess.operator("Running security clearance... You'd be surprised how many try to fake these."))
+        await self.loadbar.YELLOW(1.5)
+
+        self.print(Mess.system(f"Operator: {self.name}, Level 3 clearance verified"))
+        await self.pause(1.0)
+        self.print(Mess.operator("Welcome to the Amethyx Remote Surface Operations program."))
+        await self.pause(1.5)
+        self.print(Mess.operator("You'll be piloting Rover XM-86 across the surface of Kepler-186f."))
+        await self.pause(1.5)
+        self.print(Mess.operator("This isn't a simulation - that hardware costs more than a lunar colony."))
+        await self.pause(1.5)
+        self.print(Mess.operator("Make smart moves. There's no undo button out there."))
+        await self.pause(1.5)
+
+        self.print()
+        tutorial = (await self.input(Mess.operator("Do you need a control refresher? (y/n) "))).strip().lower()
+        self.print()
+
+        if tutorial == 'n':
+            self.print(Mess.system("Skipping tutorial sequence..."))
+            await self.loadbar.YELLOW(1)
+        else:
+            self.print(Mess.system("Loading orientation protocol..."))
+            await self.loadbar.YELLOW(1)
+            await self.start_tutorial()
+
+        await self.run_game()
+
+    async def start_tutorial(self):
+        self.print(Mess.operator("Let's get you familiar with Rover operations..."))
+        await self.pause(1.5)
+        self.print()
+        self.print(Mess.operator("Your primary objective: Retrieve mineral samples and return to base."))
+        await self.pause(1.5)
+        self.print()
+        self.print(Mess.operator("Navigation commands: mvn (north), mve (east), mvs (south), mvw (west)"))
+        await self.pause(1.5)
+        self.print()
+        self.print(Mess.operator("Special commands: obs (scan terrain), clt (collect sample), drp (deliver sample)"))
+        await self.pause(2.0)
+        self.print()
+        self.print(Mess.operator("Watch your battery - move carefully. Charging stations [@] are your lifeline."))
+        await self.pause(2.0)
+        self.print()
+        self.print(Mess.operator("Unexplored areas [?] can be risky but rewarding. Proceed with caution."))
+        await self.pause(2.0)
+        self.print()
+        self.print(Mess.operator("Remember: it's space. Memory onboard is limited. Your code must be efficient or you won't be able to run it."))
+        await self.pause(2.0)
+        self.print()
+        self.print(Mess.operator("Each character costs 8 bytes. Normally on your smart lightbulb at home this doesnt matter. "))
+        await self.pause(2.0)
+        self.print()
+        self.print(Mess.operator("Here it can cost up to billions worth of equipent. If your code is large, it won't be run until you shorten it. "))
+        await self.pause(2.0)
+        self.print()
+        self.print(Mess.operator("Just to remind you of our syntax and design rules:"))
+        await self.pause(2.0)
+        self.print()
+        self.print(Mess.operator("Each instruction go in a new line. Just like this:"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.hint("mvn # moving north"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.hint("mve # moving east"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.hint("clt # collect sample"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.operator("You can do for loops. Syntax is simple: for 4 >> mve"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.operator("This basically moves the rover east 4 times in a row. You can also with other movements like:"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.hint("for 3 >> mve, mvw # it will move east, then west and repeat two more times"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.operator("You can also do conditional statements like:"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.hint("if mve == # then mvn else mve"))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.operator("This simulates the move to east and if it is an obsticle, it will go north. If safe, it'll go east as planned."))
+        await self.pause(1.0)
+        self.print()
+        self.print(Mess.operator("Lots of information but I think you're ready. Good luck out there."))
+        await self.pause(1.5)
+        self.print()
+        await self.input(Mess.suggestion("Press Enter to continue"))
+
+    # ====== GAME CORE FUNCTIONS ======
+    async def run_game(self, state="briefing"):
+        """Drive the whole campaign from a single loop, one mission state at a time"""
+        script = None
+
+        while state != "quit":
+            match state:
+                case "briefing":
+                    await self.start_game()
+                    state = "editing"
+
+                case "deploying":
+                    self.get_map()
+                    state = "editing"
+
+                case "editing":
+                    script = await self.write_script()
+                    self.renderer.invalidate()  # The typed script scrolled the map
+                    state = "compiling"
+
+                case "compiling":
+                    self.print(Mess.system("Compiling instructions..."))
+                    await self.loadbar.YELLOW(1.0)
+                    if not await self.check_script(script):
+                        state = "editing"
+                        continue
+                    if self.recorder is not None:
+                        self.recorder.script(script)
+                    self.scripts.append((len(script), script_size(script), self.mission.steps))
+                    loaded = self.mission.submit(script)
+                    await self.present()
+                    state = "running" if loaded else self.after_script()
+
+                case "running":
+                    with self.terminal.watch():
+                        await asyncio.create_task(self.run_script())
+                    state = self.after_script()
+
+                case "level_complete":
+                    next_level = (await self.input(Mess.operator("Proceed to next sector? (y/n): "))).lower()
+                    if next_level == 'y':
+                        self.level += 1
+                        state = "briefing" if self.intro else "deploying"
+                    else:
+                        state = "game_over"
+
+                case "game_over":
+                    await self.end_game()
+                    state = "quit"
+
+    def after_script(self):
+        """State to move to once a script has run or been rejected"""
+        if self.mission.outcome is not None and self.stats is not None:
+            self.save_result()
+        match self.mission.outcome:
+            case None:
+                return "editing"
+            case "complete":
+                return "level_complete"
+            case _:
+                return "game_over"
+
+    def save_result(self):
+        mission = self.mission
+        started, executions = self.started
+        complete = mission.outcome == "complete"
+        steps = [before for _, _, before in self.scripts[1:]] + [mission.steps]
+        self.stats.record({
+            "operator": self.name,
+            "level": self.level,
+            "outcome": mission.outcome,
+            "bytes_used": mission.memory - mission.remaining_memory,
+            "executions_used": executions - mission.executions,
+            "battery": mission.battery,
+            "bonus": mission.bonus() if complete else 0.0,
+            "duration": time.monotonic() - started
+        }, [(lines, size, after - before) for (lines, size, before), after in zip(self.scripts, steps)])
+
+    async def start_game(self):
+        self.print(Mess.operator("Transmitting mission parameters..."))
+        await self.pause(1.0)
+        self.print(Mess.system("Objective: Retrieve mineral sample from designated site"))
+        self.print(Mess.system("Secondary: Return to base with minimal energy expenditure"))
+        await self.pause(1.5)
+
+        self.print(Mess.operator("Establishing satellite uplink..."))
+        await self.loadbar.CYAN(2.0)
+
+        self.print(Mess.success("Rover telemetry: ONLINE"))
+        await self.pause(0.7)
+        self.print(Mess.system("Coordinates locked: Sector Gamma-" + str(self.rng.randint(10, 99))))
+        await self.pause(1.0)
+        self.print(Mess.system("Rendering topographic map..."))
+        await self.pause(1.5)
+
+        self.get_map()
+
+        self.print(Mess.operator(f"Alright {self.name}, you have control. Make it count."))
+
+    def get_map(self):
+        from generator import sector
+        # Seeded so the mission log can replay [?] tiles exactly as they fell
+        seed = self.rng.randrange(2 ** 32)
+        self.mission = Mission(sector(self.level), seed=seed, listener=self.queue_event)
+        self.started = (time.monotonic(), self.mission.executions)
+        self.scripts = []
+        if self.log is not None:
+            from replay import Recorder
+            self.recorder = self.recorder or Recorder(self.log)
+            self.mission.listener = self.recorder.listen(self.queue_event)
+            self.recorder.start(self.mission, self.level, seed)
+        self.print_map()
+
+    def print_map(self):
+        mission = self.mission
+        # Battery status with color coding
+        battery_color = Fore.GREEN
+        if mission.battery < 30:
+            battery_color = Fore.RED
+        elif mission.battery < 60:
+            battery_color = Fore.YELLOW
+
+        status = [
+            Mess.system(f"Battery: {battery_color}{mission.battery}%{Style.RESET_ALL}"),
+            Mess.system(f"Available memory: {mission.remaining_memory} bytes"),
+            Mess.system(f"Used memory: {mission.memory - mission.remaining_memory} bytes"),
+            Mess.system(f"Code executions left: {mission.executions}")
+        ]
+        if mission.sample_onboard:
+            status.append(Mess.success("Sample secured in cargo bay"))
+        else:
+            status.append(Mess.warning("Sample not collected"))
+
+        self.renderer.draw(mission, status)
+
+    async def write_script(self):
+        """Read a script up to its 'end' line. Pasted lines are taken in one go, ':load path' reads a file"""
+        script = []
+        size = 0
+        available = self.mission.remaining_memory
+        while 'end' not in script:
+            counter = Mess.dim(f"[{size}/{available}] ") if size <= available else Mess.error(f"[{size}/{available}] ")
+            ins = await self.input(f"{counter}{len(script) + 1}: ")
+            lines = []
+            loaded = False
+            while ins is not None:
+                if ins.strip().startswith(LOAD_COMMAND):
+                    lines.extend(self.load_script(ins.strip()[len(LOAD_COMMAND):].strip()))
+                    loaded = True
                 else:
-                    out_of_bounds()
-
-            case "obs":
-                terrain_descriptions = [
-                    "Dusty gravel field",
-                    "Rocky outcrop showing iron deposits",
-                    "Fine sand dunes shifting in the wind",
-                    "Cracked clay surface with mineral veins",
-                    "Basalt formations from ancient lava flows",
-                    "Impact crater debris field",
-                    "Crystalline formations glittering in starlight"
-                ]
-
-                print(Mess.system("Scanning terrain composition.."))
-                Loadbar.YELLOW(1.5)
-                block = strip_ansi(CURRENT_BLOCK)
-                match block:
+                    lines.append(ins)
+                if lines and lines[-1] == 'end':
+                    break
+                ins = await self.terminal.ready(PASTE_SETTLE)
+
+            before = size
+            size += script_size(lines)
+            script.extend(lines)
+            if len(lines) > 1 or loaded and lines:
+                self.print(Mess.system(f"{len(lines)} lines taken, {size} of {available} bytes used"))
+            if before <= available < size:
+                self.print(Mess.warning(f"Script is {size - available} bytes over the available memory"))
+
+        return script
+
+    def load_script(self, path):
+        """Lines of a script file, up to its first 'end'"""
+        if not self.files:
+            self.print(Mess.error("File upload isn't available on this terminal"))
+            return []
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError) as e:
+            self.print(Mess.error(f"Can't read {path or 'a file without a name'}: {getattr(e, 'strerror', None) or e}"))
+            return []
+        if 'end' in lines:
+            skipped = len(lines) - lines.index('end') - 1
+            lines = lines[:lines.index('end') + 1]
+            if skipped:
+                self.print(Mess.dim(f"{skipped} line{'s' if skipped > 1 else ''} after 'end' left out"))
+        return lines
+
+    async def check_script(self, script):
+        """Warn about what the analyzer sees coming. Returns False if the operator takes a doomed script back"""
+        from analyzer import analyze, describe
+        report = analyze(self.mission, [script])
+        for finding in report["findings"]:
+            if finding["kind"] in ("unreachable", "dead_branch"):
+                self.print(Mess.dim(describe(finding)))
+            else:
+                self.print(Mess.warning(describe(finding)))
+        if not report["doomed"]:
+            return True
+        self.print(Mess.operator("Our simulations say this script can't succeed out there."))
+        answer = (await self.input(Mess.operator("Transmit anyway? (y/n) "))).strip().lower()
+        return answer == 'y'
+
+    # ====== ENGINE EVENTS ======
+    def queue_event(self, event, data):
+        """Engine listener. The engine can't wait for animations, so events are shown by present()"""
+        self.events.append((event, data))
+
+    async def present(self):
+        """Show the operator everything the engine reported since the last call"""
+        while self.events:
+            await self.report(*self.events.popleft())
+
+    async def run_script(self):
+        """Step through the loaded script, showing each instruction as it runs. Any key aborts it"""
+        mission, abort = self.mission, self.terminal.abort
+        if self.terminal.can_abort:
+            self.print(Mess.dim(self.terminal.abort_hint))
+        while mission.outcome is None and not abort.is_set():
+            ran = mission.step()
+            await self.present()
+            # Let input and other sessions in after every step, even one that ran nothing
+            await asyncio.sleep(0)
+            if not ran:
+                break
+        if mission.outcome is None and abort.is_set():
+            if self.recorder is not None:
+                self.recorder.abort()
+            self.print(Mess.warning("Script aborted by operator"))
+        mission.finish_script()
+        await self.present()
+
+    async def report(self, event, data):
+        """Present engine events to the operator"""
+        match event:
+            case "step":
+                self.print_map()
+                await self.pause(0.3)
+
+            case "unknown":
+                self.print(Mess.warning(f"Line {data['line']}: unknown instruction '{data['ins']}' will be skipped"))
+
+            case "overflow":
+                self.print(Mess.error("Memory overflow! Script too large."))
+                self.print(Mess.system(f"Required: {data['size']} bytes | Available: {data['available']} bytes"))
+                await self.pause(3.0)
+
+            case "loaded":
+                self.print(Mess.success(f"Script loaded ({data['size']} bytes)"))
+                await self.pause(1.0)
+
+            case "scan":
+                self.print(Mess.system("Scanning terrain composition.."))
+                await self.loadbar.YELLOW(1.5)
+                match data["block"]:
                     case "[X]":
-                        td = random.choice(terrain_descriptions)
-                        print(Mess.system(td))
+                        td = self.rng.choice(terrain_descriptions)
+                        self.print(Mess.system(td))
                     case "[B]":
-                        print(Mess.system("Base station - return point for samples"))
+                        self.print(Mess.system("Base station - return point for samples"))
                     case "[S]":
-                        print(Mess.system("Sample site: High mineral concentration detected"))
+                        self.print(Mess.system("Sample site: High mineral concentration detected"))
                     case "[@]":
-                        print(Mess.system("Charging station: Solar-powered energy replenishment node"))
+                        self.print(Mess.system("Charging station: Solar-powered energy replenishment node"))
                     case "[?]":
-                        print(Mess.system("Uncharted territory: Sensor readings inconclusive"))
-                        print(Mess.operator("These zones are unpredictable - could be gold or could be trouble."))
-                time.sleep(1.5)
-
-            case "clt":
-                if strip_ansi(CURRENT_BLOCK) == "[S]":
-                    print(Mess.system("Extending drill apparatus.."))
-                    Loadbar.CYAN(2.5)
-                    if 0 <= ROVER_POS[0] < len(GRID) and 0 <= ROVER_POS[1] < len(GRID[0]):
-                        GRID[ROVER_POS[0]][ROVER_POS[1]] = "[X]"  # Convert to path
-                    print(Mess.success("Core sample secured in storage"))
-                    SAMPLE_ONBOARD = True
-                    time.sleep(1.0)
-                    print(Mess.operator(f"Excellent work {NAME}. That sample is worth more than our annual budget. Get it back safely."))
-                    time.sleep(2.5)
-                else:
-                    print(Mess.error("No sample detected at this location"))
-                    time.sleep(1.5)
-
-            case "drp":
-                if strip_ansi(CURRENT_BLOCK) == "[B]" and SAMPLE_ONBOARD:
-                    print(Mess.system("Initiating sample transfer.."))
-                    Loadbar.CYAN(3.0)
-                    print(Mess.success("Sample container secured!"))
-                    print(Mess.operator(f"Mission accomplished {NAME}! Lab team is ecstatic."))
-                    time.sleep(2.0)
-                    
-                    if LEVEL == 1:
-                        print(Mess.operator("""
+                        self.print(Mess.system("Uncharted territory: Sensor readings inconclusive"))
+                        self.print(Mess.operator("These zones are unpredictable - could be gold or could be trouble."))
+                await self.pause(1.5)
+
+            case "collect":
+                self.print(Mess.system("Extending drill apparatus.."))
+                await self.loadbar.CYAN(2.5)
+                self.print(Mess.success("Core sample secured in storage"))
+                await self.pause(1.0)
+                self.print(Mess.operator(f"Excellent work {self.name}. That sample is worth more than our annual budget. Get it back safely."))
+                await self.pause(2.5)
+
+            case "collect_failed":
+                self.print(Mess.error("No sample detected at this location"))
+                await self.pause(1.5)
+
+            case "no_route":
+                self.print(Mess.warning(f"No known route to {data['target']}, holding position"))
+                await self.pause(1.5)
+
+            case "deliver":
+                self.print(Mess.system("Initiating sample transfer.."))
+                await self.loadbar.CYAN(3.0)
+                self.print(Mess.success("Sample container secured!"))
+                self.print(Mess.operator(f"Mission accomplished {self.name}! Lab team is ecstatic."))
+                await self.pause(2.0)
+
+                if self.level == 1:
+                    self.print(Mess.operator("""
 Outstanding work for a first mission. That sample shows promising exobiological signatures. 
 We're advancing you to more challenging terrain - expect more complex mineral formations 
 and unpredictable weather patterns. Remember: 
@@ -520,214 +574,104 @@ and unpredictable weather patterns. Remember:
     Carelessness = Unemployment
 
 Your bonus for this run: €{:,.2f}. Spend it wisely.
-""".format((MEMORY - LIVE_SCRIPT_SIZE) * COST_PER_BYTE)))
-                        time.sleep(5.0)
-                    
-                    next_level = safe_input(Mess.operator("Proceed to next sector? (y/n): ")).lower()
-                    if next_level == 'y':
-                        LEVEL += 1
-                        REMAINING_MEMORY = MEMORY
-                        start_game()
-                    else:
-                        end_game()
-
-                elif SAMPLE_ONBOARD:
-                    print(Mess.warning("You can only deliver samples at base stations"))
-                    time.sleep(1.5)
-                else:
-                    print(Mess.error("No sample in cargo bay"))
-                    time.sleep(1.5)
-
-    # Handle special block actions AFTER updating position
-    handle_action(strip_ansi(CURRENT_BLOCK))
-    print_map()
-
-def handle_if(condition):
-    """Handle conditional logic with variable comparisons"""
-    global BATTERY, MEMORY, EXECUTIONS
-
-    _, left, op, right, _, then_cmd, _, else_cmd = condition
-    right = right.strip("'\"")  # Strip quotes
-
-    def get_value(token):
-        token_upper = token.upper()
-        if token_upper == "BATTERY":
-            return BATTERY
-        elif token_upper == "MEMORY":
-            return MEMORY
-        elif token_upper == "EXECUTIONS":
-            return EXECUTIONS
-        elif token_upper == "LEVEL":
-            return LEVEL
-        elif token_upper == "CURRENT_BLOCK":
-            block = strip_ansi(CURRENT_BLOCK)
-            return block[1] if len(block) == 3 and block.startswith('[') and block.endswith(']') else block
-        elif token in {"mvn", "mve", "mvs", "mvw"}:
-            return simulate_block(token)
-        try:
-            return int(token)
-        except ValueError:
-            return token.strip("\"'")
-
-    def simulate_block(move):
-        dr = {"mvn": -1, "mve": 0, "mvs": 1, "mvw": 0}
-        dc = {"mvn": 0, "mve": 1, "mvs": 0, "mvw": -1}
-        r, c = ROVER_POS[0] + dr[move], ROVER_POS[1] + dc[move]
-        if 0 <= r < len(GRID) and 0 <= c < len(GRID[0]):
-            block = strip_ansi(GRID[r][c])
-            return block[1] if len(block) == 3 and block.startswith('[') and block.endswith(']') else block
-        return None
-
-    def execute(cmd):
-        if cmd.startswith("for"):
-            match = re.match(r"for\s+(\d+)\s*>>\s*(.+)", cmd)
-            if match:
-                count, cmds = int(match.group(1)), [x.strip() for x in match.group(2).split(",")]
-                for _ in range(count):
-                    for c in cmds:
-                        parse_commands(c)
-        else:
-            parse_commands(cmd)
-
-    left_val = get_value(left)
-    right_val = get_value(right)
-
-    ops = {
-        "==": lambda a, b: a == b,
-        "!=": lambda a, b: a != b,
-        ">":  lambda a, b: a > b,
-        "<":  lambda a, b: a < b,
-        ">=": lambda a, b: a >= b,
-        "<=": lambda a, b: a <= b
-    }
-
-    if op in ops:
-        condition_met = ops[op](left_val, right_val)
-        execute(then_cmd if condition_met else else_cmd)
-        time.sleep(0.5)
-
-def handle_for(condition):
-    """Expand loop commands into individual instructions"""
-    count = int(condition[1])
-    cmds = condition[3:]
-    expanded = cmds * count
-    for cmd in expanded:
-        parse_commands(cmd)
-        time.sleep(0.5)
-
-def handle_action(block):
-    global BATTERY
-    match block:
-        case "[?]":
-            # Always convert [?] to [X] after exploration
-            if 0 <= ROVER_POS[0] < len(GRID) and 0 <= ROVER_POS[1] < len(GRID[0]):
-                GRID[ROVER_POS[0]][ROVER_POS[1]] = "[X]"
-            GRID[ROVER_POS[0]][ROVER_POS[1]] = "[R]"
-            
-            outcome = random.choice(["positive", "negative"])
-            if outcome == "positive":
-                charge = min(15, 100 - BATTERY)
-                BATTERY += charge
-                print(Mess.system("Unexpected solar flare! Battery +{}%".format(charge)))
-                print(Mess.operator("Good stuff! Uncharted territory can be pleasant surprise."))
-                Loadbar.GREEN(2.5)
-            else:
-                drain = random.randint(5, 20)
-                BATTERY = max(0, BATTERY - drain)
-                print(Mess.warning("Magnetic interference! Battery -{}%".format(drain)))
-                print(Mess.operator("Yep, sometimes the unknown can kick us in the butts."))
-                Loadbar.RED(2.5)
-                
-                if BATTERY <= 0:
-                    print(Mess.error("CRITICAL POWER FAILURE"))
-                    time.sleep(1.5)
-                    end_game()
-
-        case "[@]":
-            # Always charge at charging stations
-            charge_amount = min(25, 100 - BATTERY)
-            BATTERY += charge_amount
-            
-            print(Mess.system("Charging station activated +{}%".format(charge_amount)))
-            if BATTERY < 30:
-                print(Mess.operator("That was too close for comfort. Don't push your luck next time."))
-            elif BATTERY > 90:
-                print(Mess.operator("Efficient power management. Headquarters will be pleased."))
-            Loadbar.GREEN(2.0)
-
-        case "[#]":
-            print(Mess.error("Disconnected!"))
-            time.sleep(1)
-            print(Mess.operator(f"Hey {NAME}, did something happen? I lost connection to the rover."))
-            print(Mess.system("Connecting.."))
-            Loadbar.YELLOW(5)
-            print(Mess.error("Connection failed"))
-            time.sleep(1)
-            print(Mess.operator(f"{NAME}? You crashed didn't you?"))
-            time.sleep(1)
-            print(Mess.operator(f"S&%t.."))
-            time.sleep(1)
-            end_game()
-
-
-        case _:
-            pass  # No special action for other blocks
-
-def out_of_bounds():
-    global GRID, ROVER_POS
-    print(Mess.system("Signal weakening..."))
-    Loadbar.RED(1.5)
-    print(Mess.system("Connection unstable..."))
-    Loadbar.RED(1.5)
-    print(Mess.error("LINK TERMINATED"))
-    time.sleep(1.0)
-    print(Mess.operator(f"{NAME}, we've lost telemetry! The rover's gone dark beyond the perimeter."))
-    time.sleep(3.0)
-    end_game()
-
-def execute_script(script):
-    global MEMORY, CHAR_SIZE, REMAINING_MEMORY, EXECUTIONS, LIVE_SCRIPT_SIZE
-    print(Mess.system("Compiling instructions..."))
-    Loadbar.YELLOW(1.0)
-
-    script_size = int(sum(len(s) for s in script) * CHAR_SIZE)
-    LIVE_SCRIPT_SIZE = script_size
-    EXECUTIONS -= 1
-
-    if script_size > REMAINING_MEMORY:
-        print(Mess.error("Memory overflow! Script too large."))
-        print(Mess.system(f"Required: {script_size} bytes | Available: {REMAINING_MEMORY} bytes"))
-        time.sleep(3.0)
-        write_script()
-    else:
-        REMAINING_MEMORY -= script_size
-        print(Mess.success(f"Script loaded ({script_size} bytes)"))
-        time.sleep(1.0)
-        
-        for ins in script:
-            parse_commands(ins)
-            time.sleep(0.3)
-            
-            # Check for critical conditions
-            if BATTERY <= 0:
-                print(Mess.error("POWER DEPLETED"))
-                time.sleep(1.5)
-                end_game()
-            elif EXECUTIONS <= 0:
-                print(Mess.error("EXECUTION LIMIT REACHED"))
-                time.sleep(1.5)
-                end_game()
-
-        if EXECUTIONS > 0:
-            write_script()
-
-def end_game():
-    print(Mess.system("Terminating mission protocol..."))
-    Loadbar.RED(2.0)
-    # print(Mess.operator(f"Session ended. Good work out there, {NAME}."))
-    time.sleep(2.0)
-    sys.exit(0)
+""".format(data["bonus"])))
+                    await self.pause(5.0)
+
+            case "deliver_elsewhere":
+                self.print(Mess.warning("You can only deliver samples at base stations"))
+                await self.pause(1.5)
+
+            case "deliver_empty":
+                self.print(Mess.error("No sample in cargo bay"))
+                await self.pause(1.5)
+
+            case "flare":
+                self.print(Mess.system("Unexpected solar flare! Battery +{}%".format(data["charge"])))
+                self.print(Mess.operator("Good stuff! Uncharted territory can be pleasant surprise."))
+                await self.loadbar.GREEN(2.5)
+
+            case "interference":
+                self.print(Mess.warning("Magnetic interference! Battery -{}%".format(data["drain"])))
+                self.print(Mess.operator("Yep, sometimes the unknown can kick us in the butts."))
+                await self.loadbar.RED(2.5)
+
+            case "charge":
+                self.print(Mess.system("Charging station activated +{}%".format(data["charge"])))
+                if self.mission.battery < 30:
+                    self.print(Mess.operator("That was too close for comfort. Don't push your luck next time."))
+                elif self.mission.battery > 90:
+                    self.print(Mess.operator("Efficient power management. Headquarters will be pleased."))
+                await self.loadbar.GREEN(2.0)
+
+            case "crashed":
+                self.print(Mess.error("Disconnected!"))
+                await self.pause(1)
+                self.print(Mess.operator(f"Hey {self.name}, did something happen? I lost connection to the rover."))
+                self.print(Mess.system("Connecting.."))
+                await self.loadbar.YELLOW(5)
+                self.print(Mess.error("Connection failed"))
+                await self.pause(1)
+                self.print(Mess.operator(f"{self.name}? You crashed didn't you?"))
+                await self.pause(1)
+                self.print(Mess.operator(f"S&%t.."))
+                await self.pause(1)
+
+            case "out_of_bounds":
+                self.print(Mess.system("Signal weakening..."))
+                await self.loadbar.RED(1.5)
+                self.print(Mess.system("Connection unstable..."))
+                await self.loadbar.RED(1.5)
+                self.print(Mess.error("LINK TERMINATED"))
+                await self.pause(1.0)
+                self.print(Mess.operator(f"{self.name}, we've lost telemetry! The rover's gone dark beyond the perimeter."))
+                await self.pause(3.0)
+
+            case "power":
+                self.print(Mess.error("POWER DEPLETED"))
+                await self.pause(1.5)
+
+            case "executions":
+                self.print(Mess.error("EXECUTION LIMIT REACHED"))
+                await self.pause(1.5)
+
+    async def end_game(self):
+        self.close()
+        self.print(Mess.system("Terminating mission protocol..."))
+        await self.loadbar.RED(2.0)
+        # self.print(Mess.operator(f"Session ended. Good work out there, {self.name}."))
+        await self.pause(2.0)
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
 # ====== MAIN EXECUTION ======
+async def main_async(level=1, operator=None, intro=True):
+    from colorama import init as colorama_init
+    from stats import Stats
+    colorama_init(autoreset=True)
+    terminal = Terminal()
+    stats = Stats(STATS_FILENAME) if STATS_ENABLED else None
+    session = Session(terminal, log=LOG_FILENAME if LOGGING_ENABLED else None, stats=stats, intro=intro)
+    session.level = level
+    session.name = operator
+    terminal.start()
+    try:
+        await session.init_game()
+    finally:
+        terminal.stop()
+        session.close()
+        if stats is not None:
+            stats.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Amethyx Mission Terminal")
+    parser.add_argument("--level", type=int, default=1, help="sector to start in")
+    parser.add_argument("--operator", help="operator name, instead of being asked for it")
+    parser.add_argument("--no-intro", action="store_true", help="skip the briefings and animations and go straight to the map")
+    args = parser.parse_args(argv)
+    asyncio.run(main_async(args.level, args.operator, not args.no_intro))
+
 if __name__ == '__main__':
-    init_game()
\ No newline at end of file
+    main()
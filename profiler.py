@@ -0,0 +1,191 @@
+import argparse
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+from compiler import commands
+from engine import Mission
+from grid import tile_cell
+
+# Instruction names per opcode, as in the script
+NAMES = commands + ["nop"]
+
+# ====== PROFILER ======
+class Profiler:
+    """Opt-in timing of the interpreter, the renderer and the game's delays.
+
+    enable() wraps the hot methods, time.sleep and Session.pause() in place and disable() puts the originals back,
+    so nothing is measured, and nothing costs anything, unless a profiler is active. Every call
+    becomes a span with its wall time and the part of it that was spent sleeping. Instructions
+    also record the script line, the battery change and the tile the rover ended up on.
+    """
+    def __init__(self):
+        self.events = []
+        self.patched = []
+        self.slept = 0  # Total ns spent in time.sleep or pause() while enabled
+        self.start = 0
+        self.pid = os.getpid()
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def enable(self):
+        if self.patched:
+            return
+        self.start = time.perf_counter_ns()
+        self.patch(time, "sleep", self.wrap_sleep)
+        self.patch(Mission, "execute", self.wrap_instruction)
+        self.patch(Mission, "step", functools.partial(self.wrap_span, "step", "vm"))
+        self.patch(Mission, "handle_if", functools.partial(self.wrap_span, "handle_if", "vm"))
+        self.patch(Mission, "handle_action", functools.partial(self.wrap_span, "handle_action", "tile"))
+        try:
+            import play
+        except ImportError:
+            return  # Headless, no terminal to profile
+        self.patch(play.Session, "pause", self.wrap_sleep)
+        self.patch(play.Session, "print_map", functools.partial(self.wrap_span, "print_map", "render"))
+        self.patch(play.Loadbar, "_bar", functools.partial(self.wrap_span, "loadbar", "delay"))
+
+    def disable(self):
+        for owner, name, original in reversed(self.patched):
+            setattr(owner, name, original)
+        self.patched = []
+
+    def patch(self, owner, name, wrapper):
+        original = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+        function = original.__func__ if isinstance(original, staticmethod) else original
+        setattr(owner, name, wrapper(function))
+        self.patched.append((owner, name, original))
+
+    # ====== WRAPPERS ======
+    def record(self, name, category, started, slept, args=None):
+        now = time.perf_counter_ns()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (started - self.start) / 1000,
+            "dur": (now - started) / 1000,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": {"sleep_us": (self.slept - slept) / 1000}
+        }
+        if args:
+            event["args"].update(args)
+        self.events.append(event)
+
+    def wrap_span(self, name, category, fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                started, slept = time.perf_counter_ns(), self.slept
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.record(name, category, started, slept)
+            return wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started, slept = time.perf_counter_ns(), self.slept
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, category, started, slept)
+        return wrapper
+
+    def wrap_instruction(self, fn):
+        @functools.wraps(fn)
+        def execute(mission, op):
+            started, slept = time.perf_counter_ns(), self.slept
+            battery, line = mission.battery, mission.program.lines[mission.pc - 1] if mission.pc else 0
+            try:
+                return fn(mission, op)
+            finally:
+                tile = mission.tile
+                self.record(NAMES[op], "instruction", started, slept, {
+                    "line": line,
+                    "battery_delta": mission.battery - battery,
+                    "tile": tile_cell(tile) if tile is not None else None
+                })
+        return execute
+
+    def wrap_sleep(self, fn):
+        def done(started, seconds):
+            self.slept += time.perf_counter_ns() - started
+            self.record("sleep", "delay", started, self.slept, {"seconds": seconds})
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def pause(session, seconds):
+                started = time.perf_counter_ns()
+                try:
+                    return await fn(session, seconds)
+                finally:
+                    done(started, seconds)
+            return pause
+
+        @functools.wraps(fn)
+        def sleep(seconds):
+            started = time.perf_counter_ns()
+            try:
+                return fn(seconds)
+            finally:
+                done(started, seconds)
+        return sleep
+
+    # ====== EXPORT ======
+    def trace(self):
+        """Chrome trace-event JSON, for chrome://tracing or Perfetto"""
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+
+    def summary(self):
+        """Per-span totals, worst offenders first. Times include everything the span called"""
+        totals = {}
+        for event in self.events:
+            key = (event["cat"], event["name"])
+            total = totals.setdefault(key, {"calls": 0, "wall": 0.0, "sleep": 0.0, "battery": 0})
+            total["calls"] += 1
+            total["wall"] += event["dur"]
+            total["sleep"] += event["args"]["sleep_us"] if event["name"] != "sleep" else event["dur"]
+            total["battery"] += event["args"].get("battery_delta", 0)
+
+        lines = [f"{'category':<12}{'name':<14}{'calls':>8}{'wall ms':>12}{'sleep ms':>12}{'compute ms':>12}{'us/call':>10}{'battery':>9}"]
+        for (category, name), total in sorted(totals.items(), key=lambda item: -item[1]["wall"]):
+            compute = total["wall"] - total["sleep"]
+            lines.append(f"{category:<12}{name:<14}{total['calls']:>8}{total['wall'] / 1000:>12.1f}{total['sleep'] / 1000:>12.1f}"
+                         f"{compute / 1000:>12.1f}{compute / total['calls']:>10.1f}{total['battery']:>9}")
+        return "\n".join(lines)
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Play the game with profiling on, then write a trace and print a summary. Other options go to play.py")
+    parser.add_argument("-o", "--output", default="trace.json", help="Chrome trace-event file to write")
+    args, game_args = parser.parse_known_args()
+
+    import play
+    profiler = Profiler()
+    profiler.enable()
+    try:
+        play.main(game_args)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        profiler.disable()
+        profiler.write_trace(args.output)
+        print(profiler.summary())
+        print(f"Trace written to {args.output}, open it in chrome://tracing or ui.perfetto.dev")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+import shutil
+import sys
+from colorama import Fore, Style
+
+from grid import tile_cell, WALL, BASE, SAMPLE, UNKNOWN, CHARGER
+
+# "[X] " - every cell takes four columns on screen
+CELL_WIDTH: int = 4
+# Lines kept free under the status block for messages. On a shorter terminal
+# messages scroll the map away, so every frame is drawn in full instead.
+MESSAGE_ROOM: int = 8
+# Columns of the overview drawn next to the viewport when a map doesn't fit the screen
+MINIMAP_WIDTH: int = 24
+
+# Terrain a minimap character stands for, most important first. Walls only show when
+# they fill more than half of the area, floor is '.'
+LANDMARKS = [(BASE, "B"), (SAMPLE, "S"), (CHARGER, "@"), (UNKNOWN, "?")]
+
+CLEAR = "\x1b[H\x1b[2J"
+
+def goto(line, column):
+    """Escape that moves the cursor, both 1-based"""
+    return f"\x1b[{line};{column}H"
+
+def clear_screen(out=None):
+    """Clear the terminal without spawning a shell"""
+    out = out or sys.stdout
+    out.write(CLEAR)
+    out.flush()
+
+CELL_COLORS = {
+    '[B]': Fore.CYAN,
+    '[S]': Fore.GREEN,
+    '[R]': Fore.YELLOW + Style.BRIGHT,
+    '[#]': Fore.RED + Style.BRIGHT,
+    '[?]': Fore.BLUE + Style.BRIGHT,
+    '[@]': Fore.LIGHTBLACK_EX + Style.DIM,
+    '[*]': Fore.CYAN + Style.BRIGHT,
+    '[X]': Fore.LIGHTWHITE_EX + Style.DIM
+}
+
+def color_cell(cell):
+    color = CELL_COLORS.get(cell)
+    return color + cell + Style.RESET_ALL if color else cell
+
+def color_glyph(glyph):
+    """A minimap character in the color of the cell it stands for"""
+    return CELL_COLORS.get(f"[{'X' if glyph == '.' else glyph}]", "") + glyph + Style.RESET_ALL
+
+# ====== MINIMAP ======
+class Minimap:
+    """Overview of a whole grid, one character per square block of tiles.
+
+    Tiles are counted per block once, then kept current from the tiles that change, so
+    keeping it up to date costs the changes rather than the map.
+    """
+    def __init__(self, grid, width, height):
+        self.grid = grid
+        self.block = max(-(-grid.width // width), -(-grid.height // height), 1)
+        self.width = -(-grid.width // self.block)
+        self.height = -(-grid.height // self.block)
+        self.codes = [code for code, _ in LANDMARKS] + [WALL]
+        self.tiles = bytearray(grid.tiles)  # What the counts were taken from
+        self.counts = [[0] * len(self.codes) for _ in range(self.width * self.height)]
+        block = self.block
+        for r in range(grid.height):
+            row = r * grid.width
+            first = (r // block) * self.width
+            for b in range(self.width):
+                start, end = row + b * block, row + min((b + 1) * block, grid.width)
+                counts = self.counts[first + b]
+                for k, code in enumerate(self.codes):
+                    counts[k] += self.tiles.count(code, start, end)
+
+    def index(self, pos):
+        return (pos[0] // self.block) * self.width + pos[1] // self.block
+
+    def update(self, pos):
+        """Recount a tile that changed. Returns its block"""
+        i = pos[0] * self.grid.width + pos[1]
+        old, new = self.tiles[i], self.grid.tiles[i]
+        counts = self.counts[self.index(pos)]
+        if old != new:
+            self.tiles[i] = new
+            for k, code in enumerate(self.codes):
+                counts[k] += (new == code) - (old == code)
+        return self.index(pos)
+
+    def glyph(self, b):
+        counts = self.counts[b]
+        for k, (_, glyph) in enumerate(LANDMARKS):
+            if counts[k]:
+                return glyph
+        r, c = divmod(b, self.width)
+        area = (min(self.block, self.grid.height - r * self.block)) * (min(self.block, self.grid.width - c * self.block))
+        return "#" if counts[-1] * 2 > area else "."
+
+# ====== RENDERER ======
+class Renderer:
+    """Keeps track of what is on screen and repaints only the cells and status lines that changed.
+
+    Each frame goes out as a single write. Dirty cells are the tiles rovers were on and are on now plus
+    whatever the grid recorded in `grid.changed` (revealed [?], collected samples).
+
+    A map too big for the screen is shown through a viewport around the rover, which recentres when
+    the rover nears its edge, with a minimap of the whole map beside it. A frame then costs the size
+    of the viewport, not of the map. `size` is the screen as (columns, lines), the terminal's by default.
+    """
+    def __init__(self, out=None, size=None):
+        self.out = out
+        self.size = size
+        self.minimap = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget the last frame so the next one is drawn in full"""
+        self.grid = None
+        self.rovers = ()
+        self.status = []
+        self.view = None
+        self.glyphs = {}
+
+    def cell(self, mission, pos, rovers):
+        if pos in rovers:
+            return color_cell("[R]")
+        return color_cell(tile_cell(mission.grid.get(pos)))
+
+    def fits(self, grid, status, lines):
+        return lines >= grid.height + len(status) + MESSAGE_ROOM
+
+    def draw(self, mission, status):
+        grid = mission.grid
+        rovers = set(mission.positions)
+        parts = []
+        columns, lines = self.size or shutil.get_terminal_size()
+
+        if grid.width * CELL_WIDTH > columns + 1 or grid.height + len(status) >= lines:
+            height = self.draw_view(mission, rovers, status, columns, lines, parts)
+        else:
+            height = grid.height
+            if self.grid is not grid or self.view is not None or not self.fits(grid, status, lines):
+                parts.append(CLEAR)
+                for r in range(grid.height):
+                    parts.append(goto(r + 1, 1) + " ".join(self.cell(mission, (r, c), rovers) for c in range(grid.width)))
+                self.status = []
+                self.view = None
+            else:
+                dirty = set(grid.changed)
+                dirty.update(self.rovers)
+                dirty.update(rovers)
+                for pos in dirty:
+                    parts.append(goto(pos[0] + 1, pos[1] * CELL_WIDTH + 1) + self.cell(mission, pos, rovers))
+        grid.changed.clear()
+
+        for i, line in enumerate(status):
+            if i >= len(self.status) or self.status[i] != line:
+                parts.append(goto(height + i + 1, 1) + "\x1b[2K" + line)
+
+        # Leave the cursor under the status block and wipe the previous frame's messages
+        parts.append(goto(height + len(status) + 1, 1) + "\x1b[J")
+
+        out = self.out or sys.stdout
+        out.write("".join(parts))
+        out.flush()
+
+        self.grid = grid
+        self.rovers = rovers
+        self.status = list(status)
+
+    # ====== VIEWPORT ======
+    def draw_view(self, mission, rovers, status, columns, lines, parts):
+        """Viewport and minimap frame. Returns the lines it takes up"""
+        grid = mission.grid
+        rows = max(3, min(grid.height, lines - len(status) - MESSAGE_ROOM))
+        room = columns - MINIMAP_WIDTH - 2
+        mini = room >= 3 * CELL_WIDTH
+        cols = max(3, min(grid.width, ((room if mini else columns) + 1) // CELL_WIDTH))
+
+        top, left = self.view[:2] if self.view is not None else (0, 0)
+        focus = next(iter(mission.positions), None)
+        if focus is not None:
+            top = scroll(top, focus[0], rows, grid.height)
+            left = scroll(left, focus[1], cols, grid.width)
+        view = (top, left, rows, cols)
+
+        if self.grid is not grid or self.view != view:
+            parts.append(CLEAR)
+            for r in range(top, top + rows):
+                parts.append(goto(r - top + 1, 1) + " ".join(self.cell(mission, (r, c), rovers) for c in range(left, left + cols)))
+            self.status = []
+            self.glyphs = {}
+        else:
+            dirty = set(grid.changed)
+            dirty.update(self.rovers)
+            dirty.update(rovers)
+            for r, c in dirty:
+                if top <= r < top + rows and left <= c < left + cols:
+                    parts.append(goto(r - top + 1, (c - left) * CELL_WIDTH + 1) + self.cell(mission, (r, c), rovers))
+        self.view = view
+
+        if mini:
+            self.draw_minimap(grid, rovers, rows, cols * CELL_WIDTH + 2, parts)
+        return rows
+
+    def draw_minimap(self, grid, rovers, rows, column, parts):
+        minimap = self.minimap
+        if minimap is None or minimap.grid is not grid or minimap.block != max(-(-grid.width // MINIMAP_WIDTH), -(-grid.height // rows), 1):
+            minimap = self.minimap = Minimap(grid, MINIMAP_WIDTH, rows)
+            self.glyphs = {}
+        dirty = {minimap.update(pos) for pos in grid.changed}
+        dirty.update(minimap.index(pos) for pos in self.rovers)
+        if not self.glyphs:
+            dirty = range(minimap.width * minimap.height)
+        marked = {minimap.index(pos) for pos in rovers}
+        dirty = set(dirty) | marked
+
+        for b in sorted(dirty):
+            glyph = "R" if b in marked else minimap.glyph(b)
+            if self.glyphs.get(b) != glyph:
+                self.glyphs[b] = glyph
+                r, c = divmod(b, minimap.width)
+                parts.append(goto(r + 1, column + c) + color_glyph(glyph))
+
+def scroll(start, pos, span, total):
+    """Start of a window of `span` over `total` that keeps pos away from its edges, recentring when it gets close"""
+    margin = span // 4
+    if not start + margin <= pos < start + span - margin:
+        start = pos - span // 2
+    return max(0, min(start, total - span))
@@ -0,0 +1,204 @@
+import argparse
+import json
+import time
+
+from engine import Mission, load_level, level_grid
+from renderer import Renderer
+
+# Log records, one JSON list per line:
+#   ["mission", level, seed, level dict or null]   a mission starts
+#   ["script", [lines]]                               a script was submitted
+#   ["step", op, row, col, battery]                   state after each instruction
+#   ["abort", steps]                                  the operator stopped the script after `steps` instructions
+#   ["end", outcome]                                  the mission is over
+# Campaign levels are stored by number and rebuilt on replay, other levels are stored whole.
+
+# Instructions between snapshots when seeking
+SNAPSHOT_EVERY: int = 64
+# Seconds per instruction at speed 1, the same pause the game makes
+STEP_DELAY: float = 0.3
+
+# ====== RECORDING ======
+class Recorder:
+    """Appends missions to a log file as they are played"""
+    def __init__(self, path):
+        self.path = path
+        self.mission = None
+        self.file = None
+
+    def write(self, *record):
+        if self.file is None:
+            self.file = open(self.path, "a")
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def start(self, mission, level, seed):
+        """Start recording a mission. `level` is the number it was built from, or a level dict"""
+        self.mission = mission
+        if isinstance(level, int):
+            self.write("mission", level, seed, None)
+        else:
+            level = load_level(level)
+            self.write("mission", None, seed, dict(level, map=level_grid(level).rows()))
+
+    def script(self, script):
+        self.write("script", script)
+        self.file.flush()
+
+    def abort(self):
+        self.write("abort", self.mission.steps)
+        self.file.flush()
+
+    def listen(self, listener=None):
+        """Listener for the mission that records it, then passes events on"""
+        def record(event, data):
+            mission = self.mission
+            if event == "step":
+                self.write("step", data["op"], mission.rover_pos[0], mission.rover_pos[1], mission.battery)
+            elif event == mission.outcome:
+                self.write("end", event)
+                self.file.flush()
+            if listener is not None:
+                listener(event, data)
+        return record
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def read_log(path):
+    """Every mission in a log, as dicts with level, seed, scripts, steps and outcome"""
+    missions = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            match record[0]:
+                case "mission":
+                    _, number, seed, level = record
+                    missions.append({"level": number if level is None else level, "seed": seed, "scripts": [], "steps": [], "aborts": {}, "outcome": None})
+                case "script":
+                    missions[-1]["scripts"].append(record[1])
+                case "step":
+                    missions[-1]["steps"].append(tuple(record[1:]))
+                case "abort":
+                    missions[-1]["aborts"][len(missions[-1]["scripts"]) - 1] = record[1]
+                case "end":
+                    missions[-1]["outcome"] = record[1]
+    return missions
+
+# ====== REPLAY ======
+class Replay:
+    """Re-runs a recorded mission through the engine, instruction by instruction.
+
+    The seed makes [?] tiles land the same way, so the replay matches the recording exactly.
+    A snapshot is kept every SNAPSHOT_EVERY instructions, so seeking back is a restore and a
+    short run forward instead of a replay from the start.
+    """
+    def __init__(self, record):
+        from generator import sector
+        self.record = record
+        level = record["level"]
+        self.mission = Mission(sector(level) if isinstance(level, int) else level, seed=record["seed"])
+        self.script_index = -1
+        self.loaded = False
+        self.snapshots = {0: self.save()}
+
+    def save(self):
+        return (self.mission.snapshot(), self.script_index, self.loaded)
+
+    def load(self, saved):
+        snapshot, self.script_index, self.loaded = saved
+        self.mission.restore(snapshot)
+
+    def advance(self):
+        """Run the next instruction. Returns False once the recording is played out"""
+        mission = self.mission
+        scripts = self.record["scripts"]
+        while mission.outcome is None:
+            if self.loaded:
+                # A script the operator aborted stops where it did in the game
+                stopped = self.record["aborts"].get(self.script_index)
+                if (stopped is None or mission.steps < stopped) and mission.step():
+                    if mission.steps % SNAPSHOT_EVERY == 0 and mission.steps not in self.snapshots:
+                        self.snapshots[mission.steps] = self.save()
+                    return True
+                self.loaded = False
+                mission.finish_script()
+            elif self.script_index + 1 < len(scripts):
+                self.script_index += 1
+                self.loaded = mission.submit(scripts[self.script_index])
+            else:
+                break
+        return False
+
+    def seek(self, step):
+        """Put the mission where it was after `step` instructions, or as far as the recording goes"""
+        if step < self.mission.steps:
+            self.load(self.snapshots[max(s for s in self.snapshots if s <= step)])
+        while self.mission.steps < step and self.advance():
+            pass
+
+    def verify(self):
+        """Replay from the start and compare against the recorded steps. Returns the first step that differs, or None"""
+        self.seek(0)
+        recorded = self.record["steps"]
+        mission = self.mission
+        for i, expected in enumerate(recorded):
+            if not self.advance():
+                return i + 1
+            if (mission.op, mission.rover_pos[0], mission.rover_pos[1], mission.battery) != expected:
+                return i + 1
+        if self.advance() or mission.outcome != self.record["outcome"]:
+            return len(recorded) + 1
+        return None
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Replay missions recorded in the mission log")
+    parser.add_argument("log", nargs="?", default="missions.log")
+    parser.add_argument("--mission", type=int, default=-1, help="which mission in the log, 1 is the first (default: the last)")
+    parser.add_argument("--list", action="store_true", help="list the recorded missions")
+    parser.add_argument("--speed", type=float, default=0, help="animate at this multiple of game speed, 0 for no animation")
+    parser.add_argument("--seek", type=int, help="show the map after this many instructions")
+    args = parser.parse_args()
+
+    missions = read_log(args.log)
+    if not missions:
+        print(f"No missions recorded in {args.log}")
+        return
+    if args.list:
+        for i, record in enumerate(missions, 1):
+            level = record["level"] if isinstance(record["level"], int) else record["level"].get("name")
+            print(f"{i:>4}: level {level}, {len(record['scripts'])} script(s), {len(record['steps'])} instructions, {record['outcome'] or 'unfinished'}")
+        return
+
+    record = missions[args.mission - 1 if args.mission > 0 else args.mission]
+    start = time.perf_counter()
+    replay = Replay(record)
+    diverged = replay.verify()
+    elapsed = time.perf_counter() - start
+    state = replay.mission.state()
+    print(f"Replayed {len(record['steps'])} instructions in {elapsed * 1000:.1f} ms: {state['outcome'] or 'unfinished'}, battery {state['battery']}%")
+    if diverged is not None:
+        print(f"Replay differs from the recording at instruction {diverged}")
+
+    if args.speed > 0 or args.seek is not None:
+        renderer = Renderer()
+        show = lambda: renderer.draw(replay.mission, [f"Instruction {replay.mission.steps}, battery {replay.mission.battery}%"])
+        end = args.seek if args.seek is not None else len(record["steps"])
+        if args.speed > 0:
+            replay.seek(0)
+            show()
+            while replay.mission.steps < end:
+                time.sleep(STEP_DELAY / args.speed)
+                if not replay.advance():
+                    break
+                show()
+        else:
+            replay.seek(end)
+            show()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import asyncio
+import sys
+import time
+
+from play import Session, Mess
+from stats import Stats, STATS_FILE
+from terminal import Terminal, MAX_LINES
+
+HOST: str = "127.0.0.1"
+PORT: int = 8023
+MAX_SESSIONS: int = 2000
+# Seconds a session may sit at a prompt before it's closed
+IDLE_TIMEOUT: float = 30 * 60
+# Bytes a slow client may have waiting before its session pauses for it
+WRITE_LIMIT: int = 64 * 1024
+# Screen size the map view is laid out for. The server's own terminal says nothing about a player's
+COLUMNS: int = 80
+ROWS: int = 24
+
+# Telnet commands a client may send. They're skipped, the server only does line mode.
+IAC, SB, SE = 255, 250, 240
+# Sent after every prompt, so scripted clients know when to type. Terminals ignore it.
+GO_AHEAD = bytes([IAC, 249])
+
+def strip_telnet(data):
+    """Drop telnet negotiation from received bytes"""
+    if IAC not in data:
+        return data
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte != IAC:
+            out.append(byte)
+            i += 1
+        elif i + 1 < len(data) and data[i + 1] == IAC:
+            out.append(IAC)
+            i += 2
+        elif i + 1 < len(data) and data[i + 1] == SB:
+            end = data.find(bytes([IAC, SE]), i)
+            i = len(data) if end == -1 else end + 2
+        else:
+            i += 3  # IAC, command, option
+    return bytes(out)
+
+# ====== CONNECTIONS ======
+class Output:
+    """Screen of a remote session. Newlines go out as CRLF, the way telnet wants them"""
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, text):
+        if not self.writer.is_closing():
+            self.writer.write(text.replace("\n", "\r\n").encode())
+
+    def flush(self):
+        pass
+
+class RemoteTerminal(Terminal):
+    """Terminal of a telnet client. Typing while a script runs aborts it once the line is sent"""
+    def __init__(self, reader, writer, idle_timeout=IDLE_TIMEOUT):
+        super().__init__(stream=reader, out=Output(writer), max_lines=MAX_LINES)
+        self.reader = reader
+        self.writer = writer
+        self.idle_timeout = idle_timeout
+        self.task = None
+
+    @property
+    def can_abort(self):
+        return True
+
+    @property
+    def abort_hint(self):
+        return "Press Enter to abort the script"
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.receive())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def receive(self):
+        try:
+            while data := await self.reader.read(1024):
+                self.feed(strip_telnet(data).decode(errors="replace"))
+        except ConnectionError:
+            pass
+        self.close()
+
+    async def input(self, prompt=""):
+        self.out.write(prompt)
+        if not self.writer.is_closing():
+            self.writer.write(GO_AHEAD)
+        try:
+            return await asyncio.wait_for(super().input(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            raise EOFError from None
+
+    async def drain(self):
+        if not self.writer.is_closing():
+            await self.writer.drain()
+
+# ====== SERVER ======
+class Server:
+    """Hosts a game session per TCP connection, all on one event loop. Sessions share one stats store.
+    Maps are drawn for a `screen` of (columns, lines)"""
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT, speed=1.0, stats=None, screen=(COLUMNS, ROWS)):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.speed = speed
+        self.stats = stats
+        self.screen = screen
+        self.sessions = set()
+        self.served = 0
+
+    async def handle(self, reader, writer):
+        writer.transport.set_write_buffer_limits(WRITE_LIMIT)
+        if len(self.sessions) >= self.max_sessions:
+            writer.write(Mess.error("All terminals are busy, try again later").encode() + b"\r\n")
+            await self.hang_up(writer)
+            return
+
+        terminal = RemoteTerminal(reader, writer, self.idle_timeout)
+        session = Session(terminal, out=terminal.out, speed=self.speed, files=False, stats=self.stats, screen=self.screen)
+        self.sessions.add(session)
+        self.served += 1
+        terminal.start()
+        try:
+            await session.init_game()
+        except (EOFError, ConnectionError):
+            pass
+        finally:
+            terminal.stop()
+            session.close()
+            self.sessions.discard(session)
+            await self.hang_up(writer)
+
+    async def hang_up(self, writer):
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving Amethyx on {host}:{port}, up to {self.max_sessions} sessions", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+# ====== SCRIPTED CLIENT ======
+async def play_script(lines, host=HOST, port=PORT):
+    """Connect, type each line when the server prompts for it and return everything it sent"""
+    reader, writer = await asyncio.open_connection(host, port)
+    lines = iter(lines)
+    output = bytearray()
+    seen = 0
+    while chunk := await reader.read(4096):
+        output += chunk
+        while (prompt := output.find(GO_AHEAD, seen)) != -1:
+            seen = prompt + len(GO_AHEAD)
+            line = next(lines, None)
+            if line is None:
+                writer.close()  # Out of lines, hang up like a player would
+                return output.replace(GO_AHEAD, b"").decode(errors="replace")
+            writer.write(line.encode() + b"\r\n")
+    writer.close()
+    return output.replace(GO_AHEAD, b"").decode(errors="replace")
+
+async def hold_idle(count, host=HOST, port=PORT, seconds=10.0):
+    """Open `count` connections that never type anything, then close them"""
+    connections = [await asyncio.open_connection(host, port) for _ in range(count)]
+    await asyncio.sleep(seconds)
+    open_count = sum(not reader.at_eof() for reader, _ in connections)
+    for _, writer in connections:
+        writer.close()
+    return open_count
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Host the game for many players over telnet, or drive it with a scripted client")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds before a silent session is closed")
+    parser.add_argument("--speed", type=float, default=1.0, help="play animations this many times faster")
+    parser.add_argument("--cols", type=int, default=COLUMNS, help="screen width players' maps are drawn for")
+    parser.add_argument("--rows", type=int, default=ROWS, help="screen height players' maps are drawn for")
+    parser.add_argument("--stats", default=STATS_FILE, help="database that finished missions go to ('' for none)")
+    parser.add_argument("--client", metavar="FILE", help="connect and type the lines of FILE instead of serving")
+    parser.add_argument("--idle", type=int, metavar="N", help="connect N clients that stay silent instead of serving")
+    args = parser.parse_args()
+
+    if args.client:
+        with open(args.client) as f:
+            lines = f.read().splitlines()
+        print(asyncio.run(play_script(lines, args.host, args.port)))
+    elif args.idle:
+        start = time.perf_counter()
+        still_open = asyncio.run(hold_idle(args.idle, args.host, args.port))
+        print(f"{still_open} of {args.idle} idle sessions open after {time.perf_counter() - start:.1f}s")
+    else:
+        stats = Stats(args.stats) if args.stats else None
+        try:
+            asyncio.run(Server(args.max_sessions, args.idle_timeout, args.speed, stats, (args.cols, args.rows)).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if stats is not None:
+                stats.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import heapq
+from array import array
+
+from engine import load_level, level_grid, ENERGY_PER_MOVE
+from grid import distances, WALL, BASE, SAMPLE, ROVER, UNKNOWN, CHARGER
+
+# How to price a [?] tile, which is resolved at random in-game
+WORST = "worst"        # always the biggest drain: -20
+EXPECTED = "expected"  # average of the flare (+15) and the drain (-5..-20)
+
+MOVES = ["mvn", "mve", "mvs", "mvw"]
+ACTIONS = MOVES + ["clt", "drp"]
+
+def unknown_battery(battery, unknown):
+    """Battery after a [?] tile resolves, as priced by the `unknown` mode"""
+    if unknown == WORST:
+        return max(0, battery - 20)
+    return battery + 0.5 * min(15, 100 - battery) - 0.5 * 12.5
+
+def heap_key(f, battery, g, n):
+    """Lowest f first, then the fullest battery, then the deepest label"""
+    return (f << 80) | ((0xFFFF - max(0, int(battery * 64))) << 64) | ((0xFFFFFFFF - g) << 32) | n
+
+def solve(level, unknown=WORST):
+    """Cheapest legal route R -> S (clt) -> B (drp) for a level number, level dict or grid.
+
+    A* over (tile, sample onboard, battery) labels. Every instruction costs the same energy, so
+    "cheapest" means fewest instructions; the heuristic is the walking distance that's left,
+    ignoring battery. A label is dropped when an earlier one reached the same state with at least
+    as much battery, or when it can't reach a charger or the goal before running dry.
+    Returns {"moves", "battery", "steps"} or None if there's no way through.
+    A [?] tile is priced on every visit, even though in-game it turns into [X] once resolved.
+    """
+    level = load_level(level)
+    grid = level_grid(level)
+    tiles, width, height = grid.tiles, grid.width, grid.height
+    size = len(tiles)
+
+    start, sample_at, base_at = tiles.find(ROVER), tiles.find(SAMPLE), tiles.find(BASE)
+    if start == -1 or sample_at == -1 or base_at == -1:
+        return None
+
+    to_sample = distances(grid, [sample_at])
+    to_base = distances(grid, [base_at])
+    to_charger = distances(grid, [r * width + c for r, c in grid.find(CHARGER)])
+    if to_sample[start] == -1 or to_base[sample_at] == -1:
+        return None
+    after_sample = to_base[sample_at] + 1  # clt, then the walk back
+
+    # Best battery a settled label reached each state with, and the fullest label still queued
+    settled = [array('d', [-1.0]) * size, array('d', [-1.0]) * size]
+    queued = [array('d', [-1.0]) * size, array('d', [-1.0]) * size]
+    queued_steps = [array('l', [0]) * size, array('l', [0]) * size]
+    # Every label: where it is, whether it carries the sample, its battery and how it got there
+    at, carrying, charge, steps, parent, action = array('l'), bytearray(), array('d'), array('l'), array('l'), bytearray()
+    # Heap keys pack the ordering and the label into one int so pops stay cheap
+    heap = []
+    push, pop = heapq.heappush, heapq.heappop
+
+    at.append(start)
+    carrying.append(0)
+    charge.append(level["battery"])
+    steps.append(0)
+    parent.append(-1)
+    action.append(255)
+    heap.append(heap_key(to_sample[start] + after_sample + 1, level["battery"], 0, 0))
+    finish = None
+
+    while heap:
+        key = pop(heap)
+        n = key & 0xFFFFFFFF
+        f = key >> 80
+        if finish is not None and f > steps[finish]:
+            break
+        index, sample, battery, g = at[n], carrying[n], charge[n], steps[n]
+
+        if action[n] == 5:
+            if finish is None or battery > charge[finish]:
+                finish = n
+            continue
+        if battery <= settled[sample][index]:
+            continue
+        settled[sample][index] = battery
+
+        g += 1
+        candidates = []
+        r, c = divmod(index, width)
+        if r > 0:
+            candidates.append((index - width, 0))
+        if c < width - 1:
+            candidates.append((index + 1, 1))
+        if r < height - 1:
+            candidates.append((index + width, 2))
+        if c > 0:
+            candidates.append((index - 1, 3))
+        tile = tiles[index]
+        if tile == SAMPLE and not sample:
+            candidates.append((index, 4))
+        elif tile == BASE and sample:
+            candidates.append((index, 5))
+
+        for target, act in candidates:
+            if act < 4:
+                # Same settling as handle_action, inlined because this is the hot path
+                tile = tiles[target]
+                if tile == WALL:
+                    continue
+                nb = battery - ENERGY_PER_MOVE
+                if tile == CHARGER:
+                    nb += min(25, 100 - nb)
+                elif tile == UNKNOWN:
+                    nb = unknown_battery(nb, unknown)
+                to = sample
+            else:
+                nb = battery - ENERGY_PER_MOVE
+                to = 1
+            if act == 5:
+                # Delivering ends the mission, so it doesn't matter if this drains the battery
+                h = 0
+            else:
+                # Instructions left: walk, clt, walk, drp - or just walk, drp with the sample onboard
+                h = to_base[target] + 1 if to else to_sample[target] + after_sample + 1
+                # Battery has to last until a charger or the end, whichever is closer
+                need = h
+                if to_charger[target] != -1 and to_charger[target] < need:
+                    need = to_charger[target]
+                if nb <= (need - 1) * ENERGY_PER_MOVE or nb <= settled[to][target]:
+                    continue
+                if nb <= queued[to][target] and queued_steps[to][target] <= g:
+                    continue
+                if nb > queued[to][target]:
+                    queued[to][target] = nb
+                    queued_steps[to][target] = g
+
+            at.append(target)
+            carrying.append(to)
+            charge.append(nb)
+            steps.append(g)
+            parent.append(n)
+            action.append(act)
+            push(heap, heap_key(g + h, nb, g, len(at) - 1))
+
+    if finish is None:
+        return None
+
+    moves, profile = [], []
+    n = finish
+    while parent[n] != -1:
+        moves.append(ACTIONS[action[n]])
+        profile.append(charge[n])
+        n = parent[n]
+    moves.reverse()
+    profile.reverse()
+    return {"moves": moves, "battery": profile, "steps": len(moves)}
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Find the cheapest route through a level in maps.py")
+    parser.add_argument("level", type=int, nargs="?", default=1)
+    parser.add_argument("--unknown", choices=[WORST, EXPECTED], default=WORST, help="how to price [?] tiles")
+    args = parser.parse_args()
+
+    route = solve(args.level, args.unknown)
+    if route is None:
+        print(f"Level {args.level}: no legal route")
+        return
+
+    print(f"Level {args.level}: {route['steps']} instructions")
+    for i, (move, battery) in enumerate(zip(route["moves"], route["battery"]), 1):
+        print(f"{i:>4}: {move}  battery {battery:g}%")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import datetime
+import time
+
+STATS_FILE: str = "missions.db"
+
+# One row per finished mission and per script it ran. `bests` holds each operator's best
+# completed run per level, kept up to date on insert, so leaderboards never scan missions.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS missions (
+    id INTEGER PRIMARY KEY,
+    operator TEXT NOT NULL,
+    level INTEGER,
+    outcome TEXT NOT NULL,
+    bytes_used INTEGER NOT NULL,
+    executions_used INTEGER NOT NULL,
+    battery INTEGER NOT NULL,
+    bonus REAL NOT NULL,
+    duration REAL NOT NULL,
+    finished TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scripts (
+    mission INTEGER NOT NULL REFERENCES missions(id),
+    number INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    steps INTEGER NOT NULL,
+    PRIMARY KEY (mission, number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bests (
+    operator TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    mission INTEGER NOT NULL REFERENCES missions(id),
+    bonus REAL NOT NULL,
+    battery INTEGER NOT NULL,
+    bytes_used INTEGER NOT NULL,
+    PRIMARY KEY (operator, level)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS missions_operator ON missions (operator, id);
+CREATE INDEX IF NOT EXISTS missions_level ON missions (level, outcome);
+CREATE INDEX IF NOT EXISTS bests_level ON bests (level, bonus DESC, battery DESC);
+"""
+
+# A run beats an operator's best with a bigger bonus, or the same bonus and more battery left
+UPSERT_BEST = """
+INSERT INTO bests (operator, level, mission, bonus, battery, bytes_used) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (operator, level) DO UPDATE SET
+    mission = excluded.mission, bonus = excluded.bonus, battery = excluded.battery, bytes_used = excluded.bytes_used
+WHERE (excluded.bonus, excluded.battery) > (bests.bonus, bests.battery)
+"""
+
+# ====== STORE ======
+class Stats:
+    """Mission results in a local SQLite database, for leaderboards and history.
+
+    The database is opened on first use, so a game starts without waiting for SQLite.
+    """
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            import sqlite3
+            self._db = sqlite3.connect(self.path)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, and a commit doesn't wait for the disk
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def record(self, result, scripts=()):
+        """Store a finished mission and its scripts in one transaction. Returns the mission id.
+
+        `result` has operator, level, outcome, bytes_used, executions_used, battery, bonus and
+        duration. `scripts` are (lines, bytes, steps) in the order they ran.
+        """
+        finished = result.get("finished") or datetime.datetime.now().isoformat(timespec="seconds")
+        with self.db:
+            cursor = self.db.execute(
+                "INSERT INTO missions (operator, level, outcome, bytes_used, executions_used, battery, bonus, duration, finished)"
+                " VALUES (:operator, :level, :outcome, :bytes_used, :executions_used, :battery, :bonus, :duration, :finished)",
+                dict(result, finished=finished))
+            mission = cursor.lastrowid
+            self.db.executemany(
+                "INSERT INTO scripts (mission, number, lines, bytes, steps) VALUES (?, ?, ?, ?, ?)",
+                [(mission, number, *script) for number, script in enumerate(scripts, 1)])
+            if result["outcome"] == "complete" and result["level"] is not None:
+                self.db.execute(UPSERT_BEST, (result["operator"], result["level"], mission, result["bonus"], result["battery"], result["bytes_used"]))
+        return mission
+
+    def leaderboard(self, level, limit=10):
+        """Best completed run of each operator on a level, highest bonus first"""
+        return [dict(row) for row in self.db.execute(
+            "SELECT operator, bonus, battery, bytes_used, mission FROM bests WHERE level = ?"
+            " ORDER BY bonus DESC, battery DESC LIMIT ?", (level, limit))]
+
+    def personal_bests(self, operator):
+        """An operator's best completed run on every level they've finished, with their rank there"""
+        return [dict(row) for row in self.db.execute(
+            "SELECT b.level, b.bonus, b.battery, b.bytes_used, b.mission,"
+            " (SELECT COUNT(*) FROM bests o WHERE o.level = b.level AND (o.bonus, o.battery) > (b.bonus, b.battery)) + 1 AS rank"
+            " FROM bests b WHERE b.operator = ? ORDER BY b.level", (operator,))]
+
+    def history(self, operator, limit=20):
+        """An operator's most recent missions, newest first"""
+        return [dict(row) for row in self.db.execute(
+            "SELECT id, level, outcome, bytes_used, executions_used, battery, bonus, duration, finished FROM missions"
+            " WHERE operator = ? ORDER BY id DESC LIMIT ?", (operator, limit))]
+
+    def summary(self, level):
+        """Missions played on a level and how they ended"""
+        return {row["outcome"]: row["count"] for row in self.db.execute(
+            "SELECT outcome, COUNT(*) AS count FROM missions WHERE level = ? GROUP BY outcome", (level,))}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboards and personal bests from recorded missions")
+    parser.add_argument("--db", default=STATS_FILE)
+    parser.add_argument("--level", type=int, help="show the leaderboard of this level")
+    parser.add_argument("--operator", help="show this operator's personal bests and recent missions")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    if args.level is None and args.operator is None:
+        args.level = 1
+
+    stats = Stats(args.db)
+    start = time.perf_counter()
+    if args.level is not None:
+        print(f"Level {args.level} leaderboard")
+        for rank, row in enumerate(stats.leaderboard(args.level, args.limit), 1):
+            print(f"  {rank:>3}. {row['operator']:<20} €{row['bonus']:>10,.2f}  battery {row['battery']:>3}%  {row['bytes_used']:>6} bytes")
+        outcomes = ", ".join(f"{outcome} {count:,}" for outcome, count in stats.summary(args.level).items())
+        print(f"  Missions: {outcomes or 'none yet'}")
+    if args.operator is not None:
+        print(f"Personal bests of {args.operator}")
+        for row in stats.personal_bests(args.operator):
+            print(f"  Level {row['level']:>3}  €{row['bonus']:>10,.2f}  battery {row['battery']:>3}%  rank {row['rank']}")
+        print("Recent missions")
+        for row in stats.history(args.operator, args.limit):
+            print(f"  {row['finished']}  level {row['level']:>3}  {row['outcome']:<14} €{row['bonus']:>10,.2f}  {row['duration']:.0f}s")
+    print(f"Queried in {(time.perf_counter() - start) * 1000:.1f} ms")
+    stats.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+import contextlib
+import os
+import sys
+import threading
+
+# How often a Windows console is checked for an abort key
+KEY_POLL: float = 0.05
+# Typed lines a remote session holds for input() before more are dropped, and the longest line kept
+MAX_LINES: int = 256
+MAX_LINE: int = 4096
+
+# ====== TERMINAL ======
+class Terminal:
+    """Non-blocking keyboard input for the asyncio front-end.
+
+    Lines typed at any time are queued in order and handed out by input(), so nothing typed
+    during an animation is lost. While watch() is active, any key sets `abort` instead, which
+    is how a running script gets stopped. On a Unix terminal stdin is read from the event loop;
+    anywhere else a thread reads whole lines and aborting isn't available, except on a Windows
+    console, where keys are polled.
+
+    `max_lines` caps the lines waiting for input(). A local terminal keeps every line, however
+    much is pasted; past the cap lines are dropped with a warning on screen.
+    """
+    def __init__(self, stream=None, out=None, max_lines=0):
+        self.stream = stream or sys.stdin
+        self.out = out or sys.stdout
+        self.lines = asyncio.Queue(max_lines)
+        self.dropped = 0  # Lines dropped since the queue last had room
+        self.partial = ""
+        self.abort = asyncio.Event()
+        self.watching = False
+        self.started = False
+        self.tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.unix = self.tty and os.name != 'nt'
+
+    @property
+    def can_abort(self):
+        return self.tty
+
+    @property
+    def abort_hint(self):
+        return "Press any key to abort the script"
+
+    def start(self):
+        """Begin reading. Must be called from inside the running event loop"""
+        if self.started:
+            return
+        self.started = True
+        loop = asyncio.get_running_loop()
+        if self.unix:
+            loop.add_reader(self.stream.fileno(), self.readable)
+        else:
+            threading.Thread(target=self.read_lines, args=(loop,), daemon=True).start()
+
+    def stop(self):
+        if self.started and self.unix:
+            asyncio.get_running_loop().remove_reader(self.stream.fileno())
+        self.started = False
+
+    def readable(self):
+        data = os.read(self.stream.fileno(), 1024)
+        if not data:
+            self.stop()
+            self.close()
+        else:
+            self.feed(data.decode(errors="replace"))
+
+    def feed(self, text):
+        """Take typed text: an abort while watching, otherwise complete lines for input()"""
+        if self.watching and self.can_abort:
+            self.abort.set()
+            return
+        self.partial += text
+        while "\n" in self.partial:
+            line, self.partial = self.partial.split("\n", 1)
+            if not self.lines.full():
+                self.dropped = 0
+                self.lines.put_nowait(line.rstrip("\r")[:MAX_LINE])
+            else:
+                if not self.dropped:
+                    self.out.write(f"\nInput buffer full: lines past {self.lines.maxsize} waiting are dropped\n")
+                    self.out.flush()
+                self.dropped += 1
+        self.partial = self.partial[:MAX_LINE]
+
+    def close(self):
+        """No more input. Pending lines are still handed out, then input() raises EOFError"""
+        if self.partial:
+            self.feed("\n")
+        if self.lines.full():
+            self.lines.get_nowait()
+        self.lines.put_nowait(None)
+
+    def read_lines(self, loop):
+        for line in self.stream:
+            loop.call_soon_threadsafe(self.feed, line)
+        loop.call_soon_threadsafe(self.close)
+
+    async def input(self, prompt=""):
+        """Like input(), without blocking the event loop. Raises EOFError once stdin is closed"""
+        self.out.write(prompt)
+        self.out.flush()
+        line = await self.lines.get()
+        if line is None:
+            self.lines.put_nowait(None)  # Every later call sees the end too
+            raise EOFError
+        return line
+
+    async def ready(self, wait=0.0):
+        """The next line if it's already typed or arrives within `wait` seconds, else None. Never prompts"""
+        try:
+            line = await asyncio.wait_for(self.lines.get(), wait) if wait else self.lines.get_nowait()
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            return None
+        if line is None:
+            self.lines.put_nowait(None)  # Leave the end for input()
+        return line
+
+    async def drain(self):
+        """Wait until output has gone out. A local terminal never holds any back"""
+
+    @contextlib.contextmanager
+    def watch(self):
+        """Treat any key as an abort until the block ends"""
+        self.abort.clear()
+        self.watching = True
+        saved = None
+        poll = None
+        if self.unix:
+            import termios
+            import tty
+            fd = self.stream.fileno()
+            saved = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        elif self.tty:
+            poll = asyncio.get_running_loop().create_task(self.poll_keys())
+        try:
+            yield self.abort
+        finally:
+            self.watching = False
+            if saved is not None:
+                import termios
+                termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, saved)
+            if poll is not None:
+                poll.cancel()
+
+    async def poll_keys(self):
+        import msvcrt
+        while True:
+            while msvcrt.kbhit():
+                msvcrt.getwch()
+                self.abort.set()
+            await asyncio.sleep(KEY_POLL)
@@ -0,0 +1,49 @@
+import random
+
+from analyzer import analyze, FINISHED, INCOMPLETE
+from engine import Mission, split_blocks
+from generator import sector
+
+COMMANDS = ["mvn", "mve", "mvs", "mvw", "obs", "clt", "drp", "", "nav S", "nav B", "nav @"]
+LEFT = ["BATTERY", "mvn", "mve", "CURRENT_BLOCK", "EXECUTIONS", "7", "DIST_BASE", "DIST_CHARGE", "DIST_SAMPLE"]
+RIGHT = ["DIST_CHARGE", "DIST_BASE", "MEMORY", "50", "'#'", "'?'", "20", "BATTERY", "X", "1"]
+COMPARISONS = ["==", "!=", ">", "<", ">=", "<="]
+
+def random_line(rng):
+    r = rng.random()
+    if r < 0.1:
+        return f"for {rng.randint(0, 40)}>>" + ",".join(rng.choice(COMMANDS) or "nop" for _ in range(rng.randint(1, 4)))
+    if r < 0.25:
+        then_cmd, else_cmd = rng.choice(COMMANDS) or "nop", rng.choice(COMMANDS) or "nop"
+        return f"if {rng.choice(LEFT)} {rng.choice(COMPARISONS)} {rng.choice(RIGHT)} then {then_cmd} else {else_cmd}"
+    return rng.choice(COMMANDS)
+
+def played(level, blocks, seed):
+    mission = Mission(level, seed=seed)
+    for block in blocks:
+        if mission.outcome is not None:
+            break
+        if mission.submit(block):
+            mission.run()
+            mission.finish_script()
+    return mission.outcome or FINISHED
+
+def test_every_outcome_the_engine_reaches_is_predicted():
+    rng = random.Random(1)
+    levels = {number: sector(number) for number in range(1, 6)}
+    for _ in range(400):
+        level = dict(levels[rng.randint(1, 5)], memory=100000, executions=rng.randint(1, 2))
+        script = [random_line(rng) for _ in range(rng.randint(1, 40))]
+        if rng.random() < 0.3:
+            script.insert(rng.randint(0, len(script)), "end")
+        blocks = split_blocks(script)
+        report = analyze(Mission(level), blocks)
+        if INCOMPLETE in report["outcomes"]:
+            continue
+        for seed in range(3):
+            assert played(level, blocks, seed) in report["outcomes"], (level["level"], blocks, seed)
+
+def test_doomed_script_is_flagged():
+    report = analyze(Mission(sector(1)), [["for 20>>mvw", "end"]])
+    assert report["doomed"]
+    assert any(finding["kind"] == "out_of_bounds" for finding in report["findings"])
@@ -0,0 +1,54 @@
+import itertools
+import random
+from functools import lru_cache
+
+from compress import compress, expand, loop_line
+
+def shortest(moves):
+    """Fewest characters for moves by trying every line at every position: slow but obviously right"""
+    moves = tuple(moves)
+
+    @lru_cache(maxsize=None)
+    def best(j):
+        if j == len(moves):
+            return 0
+        cost = len(moves[j]) + best(j + 1)
+        for period in range(1, (len(moves) - j) // 2 + 1):
+            pattern = moves[j:j + period]
+            if not len(",".join(pattern)):
+                continue
+            count = 2
+            while j + count * period <= len(moves) and moves[j + (count - 1) * period:j + count * period] == pattern:
+                cost = min(cost, len(loop_line(count, pattern)) + best(j + count * period))
+                count += 1
+        return cost
+
+    return best(0)
+
+def check(moves):
+    lines = compress(moves)
+    assert expand(lines) == list(moves)
+    assert sum(len(line) for line in lines) == shortest(moves), moves
+
+def test_matches_brute_force_on_every_short_sequence():
+    for n in range(1, 9):
+        for moves in itertools.product(["mvn", "mve"], repeat=n):
+            check(moves)
+
+def test_matches_brute_force_on_random_sequences():
+    rng = random.Random(3)
+    for _ in range(300):
+        alphabet = rng.choice([["mvn"], ["mvn", "mve"], ["mvn", "mve", "clt"], ["mvn", "", "mve"]])
+        pattern = [rng.choice(alphabet) for _ in range(rng.randint(1, 5))]
+        moves, length = [], rng.randint(0, 60)
+        while len(moves) < length:
+            moves += pattern * rng.randint(1, 12) if rng.random() < 0.7 else [rng.choice(alphabet)]
+        check(moves)
+
+def test_loop_may_stop_short_of_its_longest_run():
+    # (mvn,mve) x 12 runs on into the next pattern; ending it at 10 lets that one loop cleanly
+    check(["mvn", "mve"] * 10 + ["mvn", "mve", "mvn", "mve", "clt"] * 3)
+
+def test_long_runs_become_one_loop():
+    assert compress(["mve"] * 2000) == ["for 2000>>mve"]
+    assert compress(["mve", "mvn"] * 500) == ["for 500>>mve,mvn"]
@@ -0,0 +1,31 @@
+import time
+
+from grade import grade, MAX_STEPS, STEP_LIMIT
+from generator import sector
+
+# Wall-clock allowance for a submission that can't finish. Each should stop in milliseconds.
+SECONDS: float = 5.0
+
+def graded(blocks):
+    start = time.perf_counter()
+    result = grade(sector(1), blocks, "s")
+    assert time.perf_counter() - start < SECONDS
+    return result
+
+def test_loop_that_runs_nothing_ends():
+    result = graded([["for 99999999 >> for 0 >> mvn", "end"]])
+    assert result["steps"] <= 1
+    assert not result["success"]
+
+def test_nested_empty_loops_end():
+    result = graded([["for 999999999 >> for 999999999 >> for 0 >> mvn", "mvn", "end"]])
+    assert result["steps"] <= 2
+
+def test_nav_without_route_hits_step_limit():
+    result = graded([["nav S", "clt", "for 9999999 >> nav S", "end"]])
+    assert result["outcome"] == STEP_LIMIT
+    assert result["steps"] == MAX_STEPS
+
+def test_unknown_instructions_hit_step_limit():
+    result = graded([["for 99999999 >> nop", "end"]])
+    assert result["outcome"] == STEP_LIMIT
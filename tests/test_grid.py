@@ -0,0 +1,38 @@
+import random
+
+from engine import Mission
+from grid import Grid, DistanceField, BASE, CHARGER, FLOOR, SAMPLE, UNKNOWN, WALL
+
+def random_grid(rng):
+    height, width = rng.randint(1, 12), rng.randint(1, 12)
+    codes = [FLOOR] * 4 + [WALL, UNKNOWN, UNKNOWN, SAMPLE, CHARGER]
+    grid = Grid(height, width, bytes(rng.choice(codes) for _ in range(height * width)))
+    grid.set((0, 0), BASE)
+    return grid
+
+def test_updates_match_a_rebuild():
+    rng = random.Random(1)
+    for _ in range(300):
+        grid = random_grid(rng)
+        for _ in range(20):
+            for code in (BASE, SAMPLE, CHARGER):
+                grid.distance((0, 0), code)
+            pos = (rng.randrange(grid.height), rng.randrange(grid.width))
+            grid.set(pos, rng.choice([FLOOR, FLOOR, SAMPLE, WALL, UNKNOWN]))
+            for code, field in grid.fields.items():
+                assert list(field.dist) == list(DistanceField(grid, code).dist)
+
+def test_distance_avoids_unknown_until_explored():
+    grid = Grid.from_rows([["[R]", "[?]", "[S]"], ["[X]", "[#]", "[X]"], ["[X]", "[X]", "[X]"]])
+    assert grid.distance((0, 0), SAMPLE) == 6
+    grid.set((0, 1), FLOOR)
+    assert grid.distance((0, 0), SAMPLE) == 2
+    assert grid.distance((0, 0), CHARGER) is None
+
+def test_nav_follows_the_distance_field():
+    level = [["[R]", "[#]", "[S]"], ["[X]", "[?]", "[B]"]]
+    mission = Mission(level, seed=2)
+    # No known way past the [#] and [?] yet, so the first nav waits a turn
+    mission.execute_script(["nav S", "mvs", "mve", "nav S", "clt", "nav B", "drp"])
+    assert mission.outcome == "complete"
+    assert mission.steps == 8
@@ -0,0 +1,177 @@
+import argparse
+import time
+
+import numpy as np
+
+from compiler import commands, OP_MVW, OP_CLT, OP_DRP, OP_NOP
+from engine import load_level, level_grid, ENERGY_PER_MOVE, COMPLETE, CRASHED, OUT_OF_BOUNDS, POWER
+from grid import DELTAS, FLOOR, WALL, BASE, SAMPLE, ROVER, UNKNOWN, CHARGER
+
+# Outcome per env as a small int. 0 means the mission is still running.
+OUTCOMES = [None, COMPLETE, CRASHED, OUT_OF_BOUNDS, POWER]
+RUNNING, DONE_COMPLETE, DONE_CRASHED, DONE_OUT_OF_BOUNDS, DONE_POWER = range(5)
+
+# Actions are the engine's opcodes, mvn..end, plus OP_NOP for a turn that does nothing
+ACTIONS = commands + ["nop"]
+
+# Per-action lookups, indexed by opcode
+ROW_STEP = np.array([d[0] for d in DELTAS] + [0] * (OP_NOP + 1 - len(DELTAS)), dtype=np.int32)
+COL_STEP = np.array([d[1] for d in DELTAS] + [0] * (OP_NOP + 1 - len(DELTAS)), dtype=np.int32)
+ENERGY = np.array([ENERGY_PER_MOVE] * OP_NOP + [0], dtype=np.int32)
+
+# Rewards
+REWARD_DELIVER: float = 1.0
+REWARD_COLLECT: float = 0.5
+REWARD_FAIL: float = -1.0
+
+# ====== BATCH ENVIRONMENT ======
+class BatchEnv:
+    """Many independent missions on one level, stepped together with array operations.
+
+    The rules are the same as Mission.execute: every action but a no-op costs battery, the
+    tile the rover ends up on is resolved after the action, and the mission ends on delivery,
+    a wall, the map edge or an empty battery. There are no scripts here, so memory and
+    executions don't apply. [?] tiles are rolled from NumPy's generator, not Mission's rng.
+
+    Finished envs ignore their actions until they are reset.
+    """
+    def __init__(self, level, n, seed=None):
+        level = load_level(level)
+        grid = level_grid(level)
+        start = grid.find(ROVER)[0]
+        base = grid.copy()
+        base.set(start, FLOOR)
+
+        self.n = n
+        self.height, self.width = grid.height, grid.width
+        self.start = start
+        self.start_battery = level["battery"]
+        self.rng = np.random.default_rng(seed)
+
+        size = self.height * self.width
+        self.base_tiles = np.frombuffer(bytes(base.tiles), dtype=np.uint8)
+        # Every env's grid, back to back, so a tile lookup is one fancy index
+        self.tiles = np.empty(n * size, dtype=np.uint8)
+        self.offset = np.arange(n, dtype=np.int64) * size
+        self.row = np.empty(n, dtype=np.int32)
+        self.col = np.empty(n, dtype=np.int32)
+        self.battery = np.empty(n, dtype=np.int32)
+        self.sample = np.empty(n, dtype=bool)
+        self.outcome = np.empty(n, dtype=np.int8)
+        self.steps = np.empty(n, dtype=np.int32)
+        self.reset()
+
+    @property
+    def done(self):
+        return self.outcome != RUNNING
+
+    def grids(self):
+        """Every env's map as an (n, height, width) view of tile codes"""
+        return self.tiles.reshape(self.n, self.height, self.width)
+
+    def reset(self, mask=None):
+        """Start over every env, or only the ones selected by a boolean mask. Returns observations"""
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        self.tiles.reshape(self.n, -1)[mask] = self.base_tiles
+        self.row[mask] = self.start[0]
+        self.col[mask] = self.start[1]
+        self.battery[mask] = self.start_battery
+        self.sample[mask] = False
+        self.outcome[mask] = RUNNING
+        self.steps[mask] = 0
+        return self.observe()
+
+    def observe(self):
+        """Per-env state. `grid` is live and changes with the next step; the rest are copies"""
+        return {
+            "row": self.row.copy(),
+            "col": self.col.copy(),
+            "battery": self.battery.copy(),
+            "sample": self.sample.copy(),
+            "tile": self.tiles[self.offset + self.row * self.width + self.col],
+            "outcome": self.outcome.copy(),
+            "grid": self.grids()
+        }
+
+    def step(self, actions):
+        """Apply one opcode per env. Returns (observations, rewards, done)"""
+        actions = np.asarray(actions, dtype=np.intp)
+        live = self.outcome == RUNNING
+        rewards = np.zeros(self.n, dtype=np.float32)
+
+        self.steps += live
+        self.battery -= ENERGY[actions] * live
+
+        # Moves, stopping at the map edge
+        moving = live & (actions <= OP_MVW)
+        row = self.row + ROW_STEP[actions] * moving
+        col = self.col + COL_STEP[actions] * moving
+        outside = (row < 0) | (row >= self.height) | (col < 0) | (col >= self.width)
+        self.outcome[outside] = DONE_OUT_OF_BOUNDS
+        self.row = np.where(outside, self.row, row).astype(np.int32)
+        self.col = np.where(outside, self.col, col).astype(np.int32)
+
+        at = self.offset + self.row * self.width + self.col
+        tile = self.tiles[at]
+
+        collect = live & (actions == OP_CLT) & (tile == SAMPLE)
+        self.tiles[at[collect]] = FLOOR
+        tile[collect] = FLOOR
+        self.sample |= collect
+        rewards[collect] += REWARD_COLLECT
+
+        deliver = live & (actions == OP_DRP) & (tile == BASE) & self.sample
+        self.sample[deliver] = False
+        self.outcome[deliver] = DONE_COMPLETE
+        rewards[deliver] += REWARD_DELIVER
+
+        # Resolve the tile under the rover, like handle_action
+        active = live & (self.outcome == RUNNING)
+        unknown = np.flatnonzero(active & (tile == UNKNOWN))
+        if unknown.size:
+            self.tiles[at[unknown]] = FLOOR
+            battery = self.battery[unknown]
+            flare = self.rng.integers(0, 2, unknown.size, dtype=np.int8).astype(bool)
+            drain = self.rng.integers(5, 21, unknown.size, dtype=np.int32)
+            self.battery[unknown] = np.where(flare, battery + np.minimum(15, 100 - battery), np.maximum(0, battery - drain))
+        charger = active & (tile == CHARGER)
+        self.battery[charger] += np.minimum(25, 100 - self.battery[charger])
+        self.outcome[active & (tile == WALL)] = DONE_CRASHED
+
+        self.outcome[live & (self.outcome == RUNNING) & (self.battery <= 0)] = DONE_POWER
+
+        failed = live & (self.outcome > DONE_COMPLETE)
+        rewards[failed] += REWARD_FAIL
+        return self.observe(), rewards, self.done
+
+# ====== COMMAND LINE ======
+def main():
+    parser = argparse.ArgumentParser(description="Step random actions through a batch of missions and report env-steps per second")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--envs", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    env = BatchEnv(args.level, args.envs, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    # A block of random actions reused round-robin, so generating them isn't what gets timed
+    actions = rng.integers(0, OP_DRP + 1, (64, args.envs))
+    finished = np.zeros(len(OUTCOMES), dtype=np.int64)
+
+    start = time.perf_counter()
+    for i in range(args.steps):
+        _, _, done = env.step(actions[i % len(actions)])
+        if done.any():
+            finished += np.bincount(env.outcome[done], minlength=len(OUTCOMES))
+            env.reset(done)
+    elapsed = time.perf_counter() - start
+
+    total = args.envs * args.steps
+    print(f"Level {args.level}: {total:,} env-steps in {elapsed:.2f}s, {total / elapsed:,.0f} per second")
+    for code, count in enumerate(finished[1:], 1):
+        print(f"  {OUTCOMES[code]:<14} {count:>10,}")
+
+if __name__ == '__main__':
+    main()